@@ -4,7 +4,7 @@
  * Wraps the FastAPI backend at https://prophit-ashy.vercel.app
  * Endpoints:
  * - POST /parse-pdf - Parse PDF and return transactions as JSON
- * - POST /analyse - Transaction analysis (file upload, returns HTML)
+ * - POST /analyse - Transaction analysis (file upload, returns JSON; /analyse-html for the HTML page)
  * - POST /week-ahead - Calendar predictions (file upload)
  * - POST /budget-tips?text=... - Budget tips
  * - POST /financial-summary - Financial summary (file upload)
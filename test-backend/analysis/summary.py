@@ -10,6 +10,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Any
 
 # ---------------------------------------------------------------------------
@@ -80,15 +81,6 @@ def _description_looks_like_payment(description: str, category: str) -> bool:
     return False
 
 
-def _classify_credit_side(txn: dict, account_type: str) -> str:
-    """For CREDIT-type txns: 'repayment' or 'income'. For DEBIT: not used (outflow)."""
-    category = (txn.get("transaction_category") or "").upper()
-    description = (txn.get("description") or "").strip()
-    if _description_looks_like_payment(description, category):
-        return "repayment"
-    return "income"
-
-
 def _normalize_accounts(data: dict) -> list[dict]:
     """Produce a list of account blobs with balance_current, balance_available, transactions."""
     out = []
@@ -190,6 +182,41 @@ def _match_subscription(description: str, category: str) -> bool:
     return False
 
 
+# Bucket lookups are memoised on (description, category): statements repeat the same few merchants,
+# so each distinct pair runs the keyword matchers once per process rather than once per transaction.
+# Descriptions are free text, so the caches are bounded rather than growing with every upload.
+_BUCKET_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=_BUCKET_CACHE_SIZE)
+def _income_bucket(is_credit_txn: bool, desc: str, cat: str, account_type: str) -> str:
+    if not is_credit_txn:
+        return "other_income"
+    if account_type == "CREDIT" and _description_looks_like_payment(desc, cat):
+        return "repayments_in"
+    if _match_income_salary(desc, cat):
+        return "salary_income"
+    if _match_income_benefits(desc, cat):
+        return "benefits_income"
+    # Only reached for positive amounts, so any value > 0 stands in for the amount check
+    if _match_transfer_in(desc, cat, 1.0):
+        return "transfers_in"
+    return "other_income"
+
+
+@lru_cache(maxsize=_BUCKET_CACHE_SIZE)
+def _spending_bucket(desc: str, cat: str) -> str:
+    if _match_rent(desc, cat):
+        return "rent_mortgage"
+    if _match_groceries(desc, cat):
+        return "groceries_food"
+    if _match_transport(desc, cat):
+        return "transport"
+    if _match_subscription(desc, cat):
+        return "subscriptions"
+    return "other"
+
+
 # ---------------------------------------------------------------------------
 # Time window: last 30 days from latest transaction
 # ---------------------------------------------------------------------------
@@ -203,7 +230,7 @@ def _window_30d(txns: list[dict]) -> tuple[list[dict], date | None, date | None]
         return txns, None, None
     end = max(valid)
     start = end - timedelta(days=30)
-    windowed = [t for t in txns if _txn_date(t) and start <= _txn_date(t) <= end]
+    windowed = [t for t, d in zip(txns, dates) if d and start <= d <= end]
     return windowed, start, end
 
 
@@ -271,88 +298,41 @@ def build_account_summaries(data: dict) -> list[dict]:
         windowed, window_start, window_end = _window_30d(txns)
         warnings: list[str] = []
 
-        # Totals: inflow = sum(positive), outflow = abs(sum(negative))
+        # Single pass: totals (inflow = sum(positive), outflow = abs(sum(negative))) plus the income
+        # breakdown (positive amounts; for CREDIT accounts repayments are split out) and the spending
+        # breakdown (outflows)
         total_inflow = 0.0
         total_outflow = 0.0
+        income_breakdown = dict.fromkeys(
+            ("salary_income", "benefits_income", "transfers_in", "repayments_in", "other_income"), 0.0
+        )
+        spending_breakdown = dict.fromkeys(
+            ("rent_mortgage", "groceries_food", "transport", "subscriptions", "other"), 0.0
+        )
         for t in windowed:
             amt = _amount(t)
             if amt > 0:
                 total_inflow += amt
+                bucket = _income_bucket(
+                    (t.get("transaction_type") or "").upper() == "CREDIT",
+                    (t.get("description") or "").strip(),
+                    (t.get("transaction_category") or "").upper(),
+                    account_type,
+                )
+                income_breakdown[bucket] += amt
             else:
                 total_outflow += abs(amt)
+                if amt < 0:
+                    bucket = _spending_bucket(
+                        (t.get("description") or "").strip(),
+                        (t.get("transaction_category") or "").upper(),
+                    )
+                    spending_breakdown[bucket] += abs(amt)
         net_flow = round(total_inflow - total_outflow, 2)
         total_inflow = round(total_inflow, 2)
         total_outflow = round(total_outflow, 2)
-
-        # Income breakdown (only positive amounts; for CREDIT, separate repayments)
-        salary_income = 0.0
-        benefits_income = 0.0
-        transfers_in = 0.0
-        repayments_in = 0.0
-        other_income = 0.0
-
-        for t in windowed:
-            amt = _amount(t)
-            if amt <= 0:
-                continue
-            txn_type = (t.get("transaction_type") or "").upper()
-            desc = (t.get("description") or "").strip()
-            cat = (t.get("transaction_category") or "").upper()
-            if txn_type != "CREDIT":
-                other_income += amt
-                continue
-            kind = _classify_credit_side(t, account_type)
-            if account_type == "CREDIT" and kind == "repayment":
-                repayments_in += amt
-                continue
-            if _match_income_salary(desc, cat):
-                salary_income += amt
-            elif _match_income_benefits(desc, cat):
-                benefits_income += amt
-            elif _match_transfer_in(desc, cat, amt):
-                transfers_in += amt
-            else:
-                other_income += amt
-
-        income_breakdown = {
-            "salary_income": round(salary_income, 2),
-            "benefits_income": round(benefits_income, 2),
-            "transfers_in": round(transfers_in, 2),
-            "repayments_in": round(repayments_in, 2),
-            "other_income": round(other_income, 2),
-        }
-
-        # Spending breakdown (outflows)
-        rent_mortgage = 0.0
-        groceries_food = 0.0
-        transport = 0.0
-        subscriptions = 0.0
-        other = 0.0
-        for t in windowed:
-            amt = _amount(t)
-            if amt >= 0:
-                continue
-            abs_amt = abs(amt)
-            desc = (t.get("description") or "").strip()
-            cat = (t.get("transaction_category") or "").upper()
-            if _match_rent(desc, cat):
-                rent_mortgage += abs_amt
-            elif _match_groceries(desc, cat):
-                groceries_food += abs_amt
-            elif _match_transport(desc, cat):
-                transport += abs_amt
-            elif _match_subscription(desc, cat):
-                subscriptions += abs_amt
-            else:
-                other += abs_amt
-
-        spending_breakdown = {
-            "rent_mortgage": round(rent_mortgage, 2),
-            "groceries_food": round(groceries_food, 2),
-            "transport": round(transport, 2),
-            "subscriptions": round(subscriptions, 2),
-            "other": round(other, 2),
-        }
+        income_breakdown = {k: round(v, 2) for k, v in income_breakdown.items()}
+        spending_breakdown = {k: round(v, 2) for k, v in spending_breakdown.items()}
 
         recurring = _recurring_merchants_with_cadence(txns, window_start, window_end)
 
@@ -12,23 +12,43 @@ Run:
 
 import asyncio
 import csv
+import functools
+import hashlib
+import html
 import io
+import itertools
 import json
 import logging
+import mmap
 import os
+import string
+import threading
+import time
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
+from typing import AsyncIterator
 
 logger = logging.getLogger(__name__)
 from pathlib import Path
 
 import anthropic
+import httpx
+import orjson
 import pdfplumber
+import pypdfium2 as pdfium
+from anthropic import APIError as AnthropicAPIError
 from google import genai
-from openai import OpenAI
+from google.genai import types as genai_types
+from google.genai.errors import APIError as GeminiAPIError
+from openai import APIError as OpenAIAPIError
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import StreamingResponse
+
+from analysis.summary import build_account_summaries, format_summary_for_display
+from services.context_service import aclose_http_client, get_week_context_with_availability
 
 load_dotenv()
 
@@ -91,6 +111,41 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# SDK clients are built once and shared so every call reuses the same keep-alive connection pool.
+# Anthropic and OpenAI share one httpx pool. It is sized above the combined in-flight semaphore caps
+# below, so concurrent fan-out is limited by the semaphores rather than queueing inside httpx.
+_llm_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "64")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "32")),
+    ),
+    timeout=httpx.Timeout(120.0),
+)
+# Anthropic/OpenAI SDKs retry 429s and 5xx with exponential backoff; raise their default of 2 attempts.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+_anthropic_client = (
+    anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, http_client=_llm_http_client, max_retries=LLM_MAX_RETRIES)
+    if ANTHROPIC_API_KEY else None
+)
+_gemini_client = genai.Client(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+_openai_client = (
+    AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=_llm_http_client, max_retries=LLM_MAX_RETRIES)
+    if OPENAI_API_KEY else None
+)
+
+# Per-provider cap on in-flight LLM calls, sized to typical tier limits (Gemini free tier is the tightest).
+# Bursts queue here instead of tripping provider 429s.
+_SEM_CLAUDE = asyncio.Semaphore(int(os.getenv("CLAUDE_MAX_INFLIGHT", "8")))
+_SEM_GEMINI = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_INFLIGHT", "4")))
+_SEM_OPENAI = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_INFLIGHT", "16")))
+
+# Provider failures that become "[ERROR] ..." strings. Anything else is a bug and propagates.
+_CLAUDE_ERRORS = (AnthropicAPIError, asyncio.TimeoutError)
+# google-genai only wraps HTTP error responses in APIError; connection failures and timeouts surface as raw
+# httpx errors (unlike the Anthropic/OpenAI SDKs, whose connection errors subclass APIError)
+_GEMINI_ERRORS = (GeminiAPIError, httpx.TransportError, asyncio.TimeoutError)
+_OPENAI_ERRORS = (OpenAIAPIError, asyncio.TimeoutError)
+
 # Week-ahead context (weather + holidays). If unset, use placeholder and set context_unavailable.
 USER_LAT = os.getenv("USER_LAT")
 USER_LON = os.getenv("USER_LON")
@@ -136,9 +191,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("shutdown")
+async def _close_shared_clients() -> None:
+    # Closing the shared pool closes it for both the Anthropic and OpenAI clients.
+    await _llm_http_client.aclose()
+    # Open-Meteo / OpenHolidays pool
+    await aclose_http_client()
+
+
 MAX_TRANSACTIONS = 200
 MAX_LINES = 4000
 
+# Approximate input-token budget for the transaction payload sent to the LLMs. No tokenizer dependency:
+# ~4 characters per token is a conservative average for English/JSON text.
+MAX_INPUT_TOKENS = int(os.getenv("MAX_INPUT_TOKENS", "32000"))
+_CHARS_PER_TOKEN = 4
+
+
+def fit_token_budget(text: str, max_tokens: int = MAX_INPUT_TOKENS) -> str:
+    """Cap text to roughly max_tokens, cutting at the last line break or JSON object boundary inside the budget."""
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    # Compact JSON payloads are a single line, so also accept the end of a "}," record as a cut point.
+    cut = max(text.rfind("\n", 0, max_chars), text.rfind("},", 0, max_chars - 1) + 1)
+    return text[:cut if cut > 0 else max_chars]
+
 
 def trim_transactions(data: dict) -> dict:
     """Keep only the last MAX_TRANSACTIONS per account."""
@@ -149,16 +228,32 @@ def trim_transactions(data: dict) -> dict:
     return data
 
 
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def _weekday_from_timestamp(ts: str) -> str | None:
+    try:
+        return WEEKDAY_NAMES[datetime.fromisoformat(ts.replace("Z", "+00:00")).weekday()]
+    except (ValueError, AttributeError):
+        return None
+
+
 def enrich_transactions_with_weekday(data: dict) -> dict:
     """Add day_of_week field to each transaction based on timestamp."""
+    # Exports repeat timestamps (date-only or same-second rows); parse each distinct string once.
+    by_timestamp: dict[str, str | None] = {}
     for statement in data.get("statements", []):
         for txn in statement.get("transactions", []):
-            if "timestamp" in txn:
-                try:
-                    dt = datetime.fromisoformat(txn["timestamp"].replace("Z", "+00:00"))
-                    txn["day_of_week"] = dt.strftime("%A")
-                except (ValueError, AttributeError):
-                    pass
+            if "timestamp" not in txn:
+                continue
+            ts = txn["timestamp"]
+            if not isinstance(ts, str):
+                continue
+            if ts not in by_timestamp:
+                by_timestamp[ts] = _weekday_from_timestamp(ts)
+            day = by_timestamp[ts]
+            if day is not None:
+                txn["day_of_week"] = day
     return data
 
 
@@ -360,17 +455,60 @@ def _validate_credit_output(text: str) -> str:
     return out
 
 
-def _extract_pdf(raw_bytes: bytes) -> str:
-    """Extract all text from a PDF file."""
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _extract_pdf_pdfium(raw_bytes: bytes, max_lines: int) -> str:
+    """Fast path: pdfium's native text layer, stopping at the page where max_lines is reached."""
     text_parts = []
+    line_count = 0
+    # pdfium is not thread-safe and extraction runs in to_thread workers
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(raw_bytes)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range().replace("\r\n", "\n").strip()
+                textpage.close()
+                page.close()
+                if page_text:
+                    text_parts.append(page_text)
+                    line_count += page_text.count("\n") + 1
+                    if line_count >= max_lines:
+                        break
+        finally:
+            pdf.close()
+    return "\n".join(text_parts)
+
+
+def _extract_pdf_pdfplumber(raw_bytes: bytes, max_lines: int) -> str:
+    """Fallback: pdfminer layout analysis, stopping at the page where max_lines is reached."""
+    text_parts = []
+    line_count = 0
     with pdfplumber.open(io.BytesIO(raw_bytes)) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
                 text_parts.append(page_text)
+                line_count += page_text.count("\n") + 1
+                if line_count >= max_lines:
+                    break
     return "\n".join(text_parts)
 
 
+def _extract_pdf(raw_bytes: bytes, max_lines: int = MAX_LINES) -> str:
+    """Extract text from a PDF file, stopping at the page where max_lines is reached."""
+    try:
+        text = _extract_pdf_pdfium(raw_bytes, max_lines)
+    except pdfium.PdfiumError:
+        text = ""
+    if not text:
+        # Nothing from pdfium (or it rejected the file): fall back to pdfplumber
+        text = _extract_pdf_pdfplumber(raw_bytes, max_lines)
+    # The page that reached max_lines can overshoot it; cut at exactly max_lines
+    return "\n".join(text.split("\n", max_lines)[:max_lines])
+
+
 PDF_TRANSACTION_EXTRACTION_PROMPT = """\
 You are a bank statement parser. Extract ALL transactions from the provided bank statement text.
 
@@ -405,38 +543,38 @@ async def extract_transactions_from_pdf(pdf_text: str) -> list[dict]:
         return []
 
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": PDF_TRANSACTION_EXTRACTION_PROMPT},
-                {"role": "user", "content": f"Extract transactions from this bank statement:\n\n{pdf_text[:30000]}"}
-            ],
-            max_tokens=4000,
-            temperature=0.1,
-        )
-
-        result_text = response.choices[0].message.content.strip()
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": PDF_TRANSACTION_EXTRACTION_PROMPT},
+                    {"role": "user", "content": f"Extract transactions from this bank statement:\n\n{fit_token_budget(pdf_text, 7500)}"}
+                ],
+                max_tokens=4000,
+                temperature=0.1,
+            )
+    except _OPENAI_ERRORS as e:
+        logger.error(f"PDF transaction extraction failed: {e}")
+        return []
 
-        # Clean up response - remove markdown code blocks if present
-        if result_text.startswith("```json"):
-            result_text = result_text[7:]
-        elif result_text.startswith("```"):
-            result_text = result_text[3:]
-        if result_text.endswith("```"):
-            result_text = result_text[:-3]
-        result_text = result_text.strip()
+    result_text = (response.choices[0].message.content or "").strip()
 
-        transactions = json.loads(result_text)
-        logger.info(f"Extracted {len(transactions)} transactions from PDF")
-        return transactions
+    # Clean up response - remove markdown code blocks if present
+    if result_text.startswith("```json"):
+        result_text = result_text[7:]
+    elif result_text.startswith("```"):
+        result_text = result_text[3:]
+    if result_text.endswith("```"):
+        result_text = result_text[:-3]
+    result_text = result_text.strip()
 
+    try:
+        transactions = orjson.loads(result_text)
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse LLM response as JSON: {e}")
         return []
-    except Exception as e:
-        logger.error(f"PDF transaction extraction failed: {e}")
-        return []
+    logger.info(f"Extracted {len(transactions)} transactions from PDF")
+    return transactions
 
 
 async def parse_pdf_to_transactions(raw_bytes: bytes) -> dict:
@@ -445,7 +583,8 @@ async def parse_pdf_to_transactions(raw_bytes: bytes) -> dict:
     Returns dict with transactions array and summary.
     """
     # Step 1: Extract text from PDF
-    pdf_text = _extract_pdf(raw_bytes)
+    # pdfplumber is blocking and slow; keep it off the event loop
+    pdf_text = await asyncio.to_thread(_extract_pdf, raw_bytes)
     if not pdf_text.strip():
         return {"transactions": [], "error": "Could not extract text from PDF"}
 
@@ -477,109 +616,379 @@ async def parse_pdf_to_transactions(raw_bytes: bytes) -> dict:
     }
 
 
-def _extract_csv(raw_bytes: bytes) -> str:
+def _extract_csv(raw_bytes: bytes | memoryview) -> str:
     """Convert CSV to a readable text table."""
-    text = raw_bytes.decode("utf-8", errors="replace")
+    text = str(raw_bytes, "utf-8", errors="replace")
     reader = csv.reader(io.StringIO(text))
-    rows = list(reader)
-    if not rows:
+    header = next(reader, None)
+    if header is None:
         return text
-    # Format as markdown table for LLM readability
-    header = rows[0]
-    lines = ["| " + " | ".join(header) + " |"]
-    lines.append("| " + " | ".join("---" for _ in header) + " |")
-    for row in rows[1:MAX_LINES]:
-        lines.append("| " + " | ".join(row) + " |")
-    return "\n".join(lines)
+    # Format as markdown table for LLM readability; reading stops at the line cap. Rows are formatted with
+    # map(str.join) / map(str.format) so the per-row work stays in C; ragged rows keep all their cells.
+    rows = map(" | ".join, itertools.islice(reader, MAX_LINES - 1))
+    return "\n".join([
+        f"| {' | '.join(header)} |",
+        "| " + " | ".join(["---"] * len(header)) + " |",
+        *map("| {} |".format, rows),
+    ])
+
+
+def _dump_payload(data: dict) -> str:
+    """Serialise the trimmed transaction dict for the LLM prompt (compact, non-ASCII kept as UTF-8)."""
+    # No indentation: the model doesn't need it and it roughly doubles the bytes and tokens sent.
+    return orjson.dumps(data).decode()
+
 
+# Output-format version of prepare_input. MUST be bumped whenever the prepared text changes (trimming, weekday
+# enrichment, serialisation, PDF/CSV/text extraction): ui.py persists prepared inputs under PREPARED_INPUT_TAG and
+# would otherwise keep serving copies in the old format. The size limits are folded into the tag automatically.
+PREPARED_INPUT_VERSION = 1
+PREPARED_INPUT_TAG = f"v{PREPARED_INPUT_VERSION}-t{MAX_TRANSACTIONS}-l{MAX_LINES}"
 
-def prepare_input(raw_bytes: bytes, filename: str) -> str:
-    """Parse input: supports JSON, PDF, CSV, and plain text files."""
+
+def prepare_input(raw_bytes: bytes | memoryview, filename: str) -> str:
+    """
+    Parse input: supports JSON, PDF, CSV, and plain text files.
+    Non-PDF input may be any bytes-like buffer (e.g. a memoryview over an mmap); PDFs need bytes.
+    """
     ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
 
     if ext == "pdf":
-        text = _extract_pdf(raw_bytes)
-        lines = text.splitlines()
-        if len(lines) > MAX_LINES:
-            lines = lines[:MAX_LINES]
-        return "\n".join(lines)
+        # Already capped at MAX_LINES; extraction stops at the page that reaches it
+        return _extract_pdf(raw_bytes)
 
     if ext == "json":
-        text = raw_bytes.decode("utf-8", errors="replace")
-        data = json.loads(text)
+        # orjson parses the bytes directly (no str decode); its JSONDecodeError subclasses json.JSONDecodeError,
+        # so callers are unaffected. Invalid UTF-8 is retried with replacement characters, as before.
+        try:
+            data = orjson.loads(raw_bytes)
+        except orjson.JSONDecodeError:
+            data = orjson.loads(str(raw_bytes, "utf-8", errors="replace"))
         data = trim_transactions(data)
         data = enrich_transactions_with_weekday(data)
-        return json.dumps(data, indent=2)
+        return _dump_payload(data)
 
     if ext == "csv":
         return _extract_csv(raw_bytes)
 
     # Plain text fallback (txt, etc): cap at MAX_LINES lines
-    text = raw_bytes.decode("utf-8", errors="replace")
+    text = str(raw_bytes, "utf-8", errors="replace")
     lines = text.splitlines()
     if len(lines) > MAX_LINES:
         lines = lines[:MAX_LINES]
     return "\n".join(lines)
 
 
+# Above this size, non-PDF files are mapped rather than read, so the parser works off the page cache
+# instead of a second in-memory copy of the file.
+_MMAP_THRESHOLD = 1 << 20
+
+
+def prepare_input_path(filepath: str | Path) -> str:
+    """prepare_input for a file on disk, without holding a bytes copy of large non-PDF files."""
+    path = str(filepath)
+    # Unbuffered: FileIO.readall sizes its buffer from fstat and reads the file in one go, so a BufferedReader
+    # layer would only add a copy
+    with open(path, "rb", buffering=0) as f:
+        if os.fstat(f.fileno()).st_size > _MMAP_THRESHOLD and not path.lower().endswith(".pdf"):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return prepare_input(view, path)
+        raw = f.read()
+    return prepare_input(raw, path)
+
+
+# ---------------------------------------------------------------------------
+# LLM response cache
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=8)
+def _content_key(text: str) -> str:
+    # The same payload is keyed by several cached helpers per request (one per provider); encode and hash it once
+    return hashlib.blake2b(text.encode("utf-8", errors="replace"), digest_size=16).hexdigest()
+
+
+def _disk_cache_read(path: Path, ttl: float | None) -> str | None:
+    try:
+        if ttl is not None and time.time() - path.stat().st_mtime > ttl:
+            return None
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _disk_cache_write(path: Path, text: str) -> None:
+    # Write to a temp file and rename so a concurrent reader never sees a partial entry
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug("LLM disk cache write to %s failed: %s", path, e)
+        tmp.unlink(missing_ok=True)
+
+
+def _cache_by_content_hash(maxsize: int = 256, ttl: float | None = None, disk_dir: Path | None = None):
+    """
+    Memoise an async text -> text LLM helper on a blake2b digest of its input (bounded key size, LRU eviction).
+    Entries older than ttl seconds are refetched; ttl=None keeps them until evicted.
+    With disk_dir set, entries are also written there (one file per helper + digest, expiry by mtime), so they
+    survive a restart; memory misses fall back to disk before calling the helper.
+    "[ERROR]" / "[SKIPPED]" results are never cached so a transient failure is retried next call.
+    """
+    def decorator(fn):
+        cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+        def remember(key: str, out: str) -> None:
+            cache[key] = (out, time.monotonic() + ttl if ttl is not None else float("inf"))
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+
+        @functools.wraps(fn)
+        async def wrapper(text: str) -> str:
+            key = _content_key(text)
+            hit = cache.get(key)
+            if hit is not None:
+                if hit[1] > time.monotonic():
+                    cache.move_to_end(key)
+                    return hit[0]
+                del cache[key]
+            path = disk_dir / f"{fn.__name__}-{key}.txt" if disk_dir is not None else None
+            if path is not None:
+                out = await asyncio.to_thread(_disk_cache_read, path, ttl)
+                if out is not None:
+                    remember(key, out)
+                    return out
+            out = await fn(text)
+            if out and not out.startswith(("[ERROR]", "[SKIPPED]")):
+                remember(key, out)
+                if path is not None:
+                    await asyncio.to_thread(_disk_cache_write, path, out)
+            return out
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+# Pattern analyses are cached per provider, so re-running the same file (e.g. /analyse-local) skips the round-trip.
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+# Optional on-disk layer (unset = memory only): responses describe the user's statements, so persisting them is opt-in
+LLM_CACHE_DIR = Path(os.environ["LLM_CACHE_DIR"]) if os.getenv("LLM_CACHE_DIR") else None
+
+
 # ---------------------------------------------------------------------------
 # LLM provider functions
 # ---------------------------------------------------------------------------
 
+async def _gemini_generate(contents: str, config: genai_types.GenerateContentConfig | None = None):
+    """Gemini call under its semaphore. The SDK has no built-in 429 retry, so back off here."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with _SEM_GEMINI:
+                return await _gemini_client.aio.models.generate_content(
+                    model="gemini-2.5-flash-lite",
+                    contents=contents,
+                    config=config,
+                )
+        except GeminiAPIError as e:
+            if e.code != 429 or attempt == LLM_MAX_RETRIES:
+                raise
+        await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+@_cache_by_content_hash(ttl=LLM_CACHE_TTL, disk_dir=LLM_CACHE_DIR)
 async def ask_claude(data_str: str) -> str:
     """Send data to Claude and return the response."""
     if not ANTHROPIC_API_KEY:
         return "[SKIPPED] ANTHROPIC_API_KEY not set"
 
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=1024,
-            system=SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": data_str}],
-        )
+        async with _SEM_CLAUDE:
+            message = await _anthropic_client.messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=1024,
+                system=SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": data_str}],
+            )
         return message.content[0].text
-    except Exception as e:
+    except _CLAUDE_ERRORS as e:
         return f"[ERROR] Claude failed: {e}"
 
 
+# System prompt goes in as a system instruction, so the user content is just the payload (no prefixed copy)
+_GEMINI_PATTERN_CONFIG = genai_types.GenerateContentConfig(system_instruction=SYSTEM_PROMPT)
+
+
+@_cache_by_content_hash(ttl=LLM_CACHE_TTL, disk_dir=LLM_CACHE_DIR)
 async def ask_gemini(data_str: str) -> str:
     """Send data to Gemini and return the response."""
     if not GEMINI_API_KEY:
         return "[SKIPPED] GEMINI_API_KEY not set"
 
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=f"{SYSTEM_PROMPT}\n\n{data_str}",
-        )
+        response = await _gemini_generate(data_str, _GEMINI_PATTERN_CONFIG)
         return response.text
-    except Exception as e:
+    except _GEMINI_ERRORS as e:
         return f"[ERROR] Gemini failed: {e}"
 
 
+@_cache_by_content_hash(ttl=LLM_CACHE_TTL, disk_dir=LLM_CACHE_DIR)
 async def ask_openai(data_str: str) -> str:
     """Send data to OpenAI and return the response."""
     if not OPENAI_API_KEY:
         return "[SKIPPED] OPENAI_API_KEY not set"
 
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": data_str},
-            ],
-            max_tokens=1024,
-        )
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": data_str},
+                ],
+                max_tokens=1024,
+            )
         return response.choices[0].message.content
-    except Exception as e:
+    except _OPENAI_ERRORS as e:
         return f"[ERROR] OpenAI failed: {e}"
 
 
+# Providers with a key, resolved once at import; fan-outs only schedule these.
+_SKIPPED_PROVIDERS = {
+    "claude": "[SKIPPED] ANTHROPIC_API_KEY not set",
+    "gemini": "[SKIPPED] GEMINI_API_KEY not set",
+    "openai": "[SKIPPED] OPENAI_API_KEY not set",
+}
+_ENABLED_PROVIDERS = tuple(
+    name for name, key in (("claude", ANTHROPIC_API_KEY), ("gemini", GEMINI_API_KEY), ("openai", OPENAI_API_KEY))
+    if key
+)
+_PROVIDER_CALLS = {"claude": ask_claude, "gemini": ask_gemini, "openai": ask_openai}
+logger.info("LLM providers enabled", extra={"providers": list(_ENABLED_PROVIDERS)})
+
+
+async def _warm_llm_connections() -> None:
+    """
+    Open (or refresh) keep-alive connections to the enabled Anthropic/OpenAI hosts on the shared pool, so the
+    real calls skip TCP+TLS setup. Best effort: any failure is ignored and the call simply connects itself.
+    """
+    urls = [c.base_url for c in (_anthropic_client, _openai_client) if c is not None]
+    results = await asyncio.gather(
+        *(_llm_http_client.head(str(url), timeout=5.0) for url in urls), return_exceptions=True
+    )
+    for url, r in zip(urls, results):
+        if isinstance(r, Exception):
+            logger.debug("Connection warm-up to %s failed: %s", url, r)
+
+
+async def ask_all_providers(data_str: str) -> tuple[str, str, str]:
+    """
+    Run every enabled provider concurrently. Returns (claude, gemini, openai); disabled providers get
+    their "[SKIPPED] ..." string and exceptions are returned as "[ERROR] ..." strings.
+    """
+    data_str = fit_token_budget(data_str)
+    results = dict(_SKIPPED_PROVIDERS)
+    outputs = await asyncio.gather(
+        *(_PROVIDER_CALLS[name](data_str) for name in _ENABLED_PROVIDERS),
+        return_exceptions=True,
+    )
+    for name, r in zip(_ENABLED_PROVIDERS, outputs):
+        results[name] = f"[ERROR] {type(r).__name__}: {r}" if isinstance(r, Exception) else r
+    return results["claude"], results["gemini"], results["openai"]
+
+
+# --- Streaming variants: yield text chunks as they arrive (same prompts/models as above) ---
+
+async def ask_claude_stream(data_str: str) -> AsyncIterator[str]:
+    if not ANTHROPIC_API_KEY:
+        yield "[SKIPPED] ANTHROPIC_API_KEY not set"
+        return
+    try:
+        async with _SEM_CLAUDE:
+            async with _anthropic_client.messages.stream(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=1024,
+                system=SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": data_str}],
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+    except _CLAUDE_ERRORS as e:
+        yield f"[ERROR] Claude failed: {e}"
+
+
+async def ask_gemini_stream(data_str: str) -> AsyncIterator[str]:
+    if not GEMINI_API_KEY:
+        yield "[SKIPPED] GEMINI_API_KEY not set"
+        return
+    try:
+        async with _SEM_GEMINI:
+            async for chunk in await _gemini_client.aio.models.generate_content_stream(
+                model="gemini-2.5-flash-lite",
+                contents=data_str,
+                config=_GEMINI_PATTERN_CONFIG,
+            ):
+                if chunk.text:
+                    yield chunk.text
+    except _GEMINI_ERRORS as e:
+        yield f"[ERROR] Gemini failed: {e}"
+
+
+async def ask_openai_stream(data_str: str) -> AsyncIterator[str]:
+    if not OPENAI_API_KEY:
+        yield "[SKIPPED] OPENAI_API_KEY not set"
+        return
+    try:
+        async with _SEM_OPENAI:
+            stream = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": data_str},
+                ],
+                max_tokens=1024,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except _OPENAI_ERRORS as e:
+        yield f"[ERROR] OpenAI failed: {e}"
+
+
+_PROVIDER_STREAMS = {"claude": ask_claude_stream, "gemini": ask_gemini_stream, "openai": ask_openai_stream}
+
+
+async def _merge_streams(streams: dict[str, AsyncIterator[str]]) -> AsyncIterator[tuple[str, str]]:
+    """Interleave several named chunk streams as (name, chunk) in arrival order."""
+    queue: asyncio.Queue[tuple[str, str | None]] = asyncio.Queue()
+
+    async def pump(name: str, stream: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in stream:
+                await queue.put((name, chunk))
+        except Exception as e:
+            # No FastAPI handler sits between us and the client once streaming has started
+            logger.exception("Stream from %s failed", name)
+            await queue.put((name, f"[ERROR] {type(e).__name__}: {e}"))
+        finally:
+            await queue.put((name, None))
+
+    tasks = [asyncio.create_task(pump(name, stream)) for name, stream in streams.items()]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            name, chunk = await queue.get()
+            if chunk is None:
+                remaining -= 1
+                continue
+            yield name, chunk
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
 # Context-effect guidance: must be included in all candidate and judge prompts.
 CONTEXT_EFFECT_GUIDANCE = """
 CONTEXT-EFFECT RULES (you MUST follow these):
@@ -717,6 +1126,12 @@ Output ONLY the chosen or merged calendar as raw JSON. No markdown fences, no ex
 """
 
 
+@functools.lru_cache(maxsize=8)
+def _calendar_prompt_for(start_date: str) -> str:
+    """CALENDAR_PROMPT formatted for start_date; only changes once a day, so cache it."""
+    return CALENDAR_PROMPT.format(start_date=start_date)
+
+
 async def ask_claude_calendar(data_str: str, claude_result: str, gemini_result: str, openai_result: str) -> str:
     """Send raw data + combined provider results to Claude to build a week-ahead calendar (legacy, no context)."""
     if not ANTHROPIC_API_KEY:
@@ -725,7 +1140,8 @@ async def ask_claude_calendar(data_str: str, claude_result: str, gemini_result:
     start = date.today() + timedelta(days=1)
     start_date = start.isoformat()
 
-    prompt = CALENDAR_PROMPT.format(start_date=start_date)
+    prompt = _calendar_prompt_for(start_date)
+    data_str = fit_token_budget(data_str)
 
     combined = (
         "=== Raw Transaction Data ===\n" + data_str + "\n\n"
@@ -735,14 +1151,14 @@ async def ask_claude_calendar(data_str: str, claude_result: str, gemini_result:
     )
 
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=2048,
-            messages=[{"role": "user", "content": f"{prompt}\n\n{combined}"}],
-        )
+        async with _SEM_CLAUDE:
+            message = await _anthropic_client.messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=2048,
+                messages=[{"role": "user", "content": f"{prompt}\n\n{combined}"}],
+            )
         return message.content[0].text
-    except Exception as e:
+    except _CLAUDE_ERRORS as e:
         return f"[ERROR] Claude calendar failed: {e}"
 
 
@@ -755,7 +1171,7 @@ def _parse_calendar_json(raw: str) -> dict | None:
     if cleaned.endswith("```"):
         cleaned = cleaned[:-3].rstrip()
     try:
-        return json.loads(cleaned)
+        return orjson.loads(cleaned)
     except (json.JSONDecodeError, TypeError):
         return None
 
@@ -787,79 +1203,75 @@ def _context_summary_line_for_prompt(metadata: dict, context_summary: str) -> st
 async def _ask_calendar_candidate_claude(
     data_str: str,
     combined_tables: str,
-    day_context: list[dict],
+    day_context_json: str,
     start_date: str,
     context_summary_line: str,
 ) -> str:
     if not ANTHROPIC_API_KEY:
         return ""
     prompt = _calendar_candidate_prompt(
-        start_date, json.dumps(day_context, indent=2), context_summary_line, "claude"
+        start_date, day_context_json, context_summary_line, "claude"
     )
     body = f"{prompt}\n\n=== Raw Transaction Data ===\n{data_str}\n\n=== Model Predictions ===\n{combined_tables}"
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=2048,
-            messages=[{"role": "user", "content": body}],
-        )
+        async with _SEM_CLAUDE:
+            message = await _anthropic_client.messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=2048,
+                messages=[{"role": "user", "content": body}],
+            )
         return message.content[0].text or ""
-    except Exception as e:
+    except _CLAUDE_ERRORS as e:
         return f"[ERROR] {e}"
 
 
 async def _ask_calendar_candidate_gemini(
     data_str: str,
     combined_tables: str,
-    day_context: list[dict],
+    day_context_json: str,
     start_date: str,
     context_summary_line: str,
 ) -> str:
     if not GEMINI_API_KEY:
         return ""
     prompt = _calendar_candidate_prompt(
-        start_date, json.dumps(day_context, indent=2), context_summary_line, "gemini"
+        start_date, day_context_json, context_summary_line, "gemini"
     )
     body = f"{prompt}\n\n=== Raw Transaction Data ===\n{data_str}\n\n=== Model Predictions ===\n{combined_tables}"
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=body,
-        )
+        response = await _gemini_generate(body)
         return response.text or ""
-    except Exception as e:
+    except _GEMINI_ERRORS as e:
         return f"[ERROR] {e}"
 
 
 async def _ask_calendar_candidate_openai(
     data_str: str,
     combined_tables: str,
-    day_context: list[dict],
+    day_context_json: str,
     start_date: str,
     context_summary_line: str,
 ) -> str:
     if not OPENAI_API_KEY:
         return ""
     prompt = _calendar_candidate_prompt(
-        start_date, json.dumps(day_context, indent=2), context_summary_line, "openai"
+        start_date, day_context_json, context_summary_line, "openai"
     )
     body = f"{prompt}\n\n=== Raw Transaction Data ===\n{data_str}\n\n=== Model Predictions ===\n{combined_tables}"
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": body}],
-            max_tokens=2048,
-        )
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": body}],
+                max_tokens=2048,
+            )
         return (response.choices[0].message.content or "").strip()
-    except Exception as e:
+    except _OPENAI_ERRORS as e:
         return f"[ERROR] {e}"
 
 
 async def _ask_judge_calendar(
-    day_context: list[dict],
+    day_context_json: str,
     claude_cal: str,
     gemini_cal: str,
     openai_cal: str,
@@ -868,23 +1280,32 @@ async def _ask_judge_calendar(
     if not ANTHROPIC_API_KEY:
         return ""
     body = (
-        f"{JUDGE_PROMPT}\n\n=== DAY CONTEXT ===\n{json.dumps(day_context, indent=2)}\n\n"
+        f"{JUDGE_PROMPT}\n\n=== DAY CONTEXT ===\n{day_context_json}\n\n"
         "=== Candidate Claude ===\n" + claude_cal + "\n\n"
         "=== Candidate Gemini ===\n" + gemini_cal + "\n\n"
         "=== Candidate OpenAI ===\n" + openai_cal
     )
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=2048,
-            messages=[{"role": "user", "content": body}],
-        )
+        async with _SEM_CLAUDE:
+            message = await _anthropic_client.messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=2048,
+                messages=[{"role": "user", "content": body}],
+            )
         return message.content[0].text or ""
-    except Exception as e:
+    except _CLAUDE_ERRORS as e:
         return f"[ERROR] {e}"
 
 
+def _combine_pattern_tables(results) -> str:
+    """Join (name, table) pairs into one prompt section, dropping [ERROR]/[SKIPPED]/empty results."""
+    parts = []
+    for name, r in results:
+        if r and not r.startswith("[ERROR]") and not r.startswith("[SKIPPED]"):
+            parts.append(f"=== {name} ===\n{r}")
+    return "\n\n".join(parts)
+
+
 async def run_week_ahead_pipeline(
     data_str: str,
     lat: float | None = None,
@@ -914,6 +1335,8 @@ async def run_week_ahead_pipeline(
       "final_calendar_raw": str
     }
     """
+    # One budgeted payload shared by the pattern tables and all three candidates
+    data_str = fit_token_budget(data_str)
     start = date.today() + timedelta(days=1)
     start_date = start.isoformat()
     lat = float(lat) if lat is not None else (float(USER_LAT) if USER_LAT else None)
@@ -931,8 +1354,11 @@ async def run_week_ahead_pipeline(
             "subdivision_code": subdivision,
         },
     )
-    from services.context_service import get_week_context_with_availability
-    day_context, context_metadata = get_week_context_with_availability(start, lat, lon, country, subdivision)
+    # Weather/holiday context and the three pattern tables are independent: fetch them together
+    (day_context, context_metadata), (claude_result, gemini_result, openai_result) = await asyncio.gather(
+        get_week_context_with_availability(start, lat, lon, country, subdivision),
+        ask_all_providers(data_str),
+    )
     context_summary = _build_context_summary(day_context)
     context_available = context_metadata.get("context_available", False)
     context_unavailable = not context_available
@@ -945,26 +1371,52 @@ async def run_week_ahead_pipeline(
     context_summary_line = _context_summary_line_for_prompt(context_metadata, context_summary)
 
     # Pattern tables from 3 models (for candidate inputs)
-    claude_result = await ask_claude(data_str)
-    gemini_result = await ask_gemini(data_str)
-    openai_result = await ask_openai(data_str)
-    combined_tables = (
-        "=== Claude ===\n" + claude_result + "\n\n=== Gemini ===\n" + gemini_result + "\n\n=== OpenAI ===\n" + openai_result
+    combined_tables = _combine_pattern_tables(
+        (("Claude", claude_result), ("Gemini", gemini_result), ("OpenAI", openai_result))
     )
 
+    result = {
+        "context_summary": context_summary,
+        "day_context": day_context,
+        "context_unavailable": context_unavailable,
+        "context_available": context_available,
+        "context_errors": context_metadata.get("context_errors", []),
+        "location_source": context_metadata.get("location_source", "unknown"),
+        "used_default_location": context_metadata.get("used_default_location", False),
+        "weather_ok": context_metadata.get("weather_ok", False),
+        "holiday_ok": context_metadata.get("holiday_ok", False),
+        "holiday_status": context_metadata.get("holiday_status", "missing"),
+        "holiday_error": context_metadata.get("holiday_error"),
+        "candidate_outputs": None,
+    }
+
+    if not combined_tables:
+        # Every pattern-table call failed or was skipped: no point paying for candidates + judge.
+        error = "All pattern-table providers failed or were skipped"
+        logger.warning("Week-ahead pipeline short-circuited: %s", error)
+        result.update({
+            "error": error,
+            "judge_output": "",
+            "final_calendar": {"week_start": start_date, "daily_predictions": [], "error": error},
+            "final_calendar_raw": "",
+        })
+        return result
+
+    # Serialised once and shared by the three candidates and the judge
+    day_context_json = orjson.dumps(day_context, option=orjson.OPT_INDENT_2).decode()
+
     # Three candidates produce calendar JSON (each sets agreed_by to its provider name)
     claude_cal, gemini_cal, openai_cal = await asyncio.gather(
-        _ask_calendar_candidate_claude(data_str, combined_tables, day_context, start_date, context_summary_line),
-        _ask_calendar_candidate_gemini(data_str, combined_tables, day_context, start_date, context_summary_line),
-        _ask_calendar_candidate_openai(data_str, combined_tables, day_context, start_date, context_summary_line),
+        _ask_calendar_candidate_claude(data_str, combined_tables, day_context_json, start_date, context_summary_line),
+        _ask_calendar_candidate_gemini(data_str, combined_tables, day_context_json, start_date, context_summary_line),
+        _ask_calendar_candidate_openai(data_str, combined_tables, day_context_json, start_date, context_summary_line),
     )
 
-    candidate_outputs = None
     if include_candidate_outputs:
-        candidate_outputs = {"claude": claude_cal, "gemini": gemini_cal, "openai": openai_cal}
+        result["candidate_outputs"] = {"claude": claude_cal, "gemini": gemini_cal, "openai": openai_cal}
 
     # Judge picks best
-    judge_raw = await _ask_judge_calendar(day_context, claude_cal, gemini_cal, openai_cal)
+    judge_raw = await _ask_judge_calendar(day_context_json, claude_cal, gemini_cal, openai_cal)
     final_calendar = _parse_calendar_json(judge_raw)
     if final_calendar is None:
         for raw in (claude_cal, gemini_cal, openai_cal):
@@ -975,23 +1427,12 @@ async def run_week_ahead_pipeline(
             final_calendar = {"week_start": start_date, "daily_predictions": [], "error": "Could not parse any calendar"}
     _normalize_final_calendar_agreed_by(final_calendar)
 
-    return {
-        "context_summary": context_summary,
-        "day_context": day_context,
-        "context_unavailable": context_unavailable,
-        "context_available": context_available,
-        "context_errors": context_metadata.get("context_errors", []),
-        "location_source": context_metadata.get("location_source", "unknown"),
-        "used_default_location": context_metadata.get("used_default_location", False),
-        "weather_ok": context_metadata.get("weather_ok", False),
-        "holiday_ok": context_metadata.get("holiday_ok", False),
-        "holiday_status": context_metadata.get("holiday_status", "missing"),
-        "holiday_error": context_metadata.get("holiday_error"),
-        "candidate_outputs": candidate_outputs,
+    result.update({
         "judge_output": judge_raw,
         "final_calendar": final_calendar,
         "final_calendar_raw": judge_raw,
-    }
+    })
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -1044,39 +1485,75 @@ async def parse_pdf_endpoint(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"PDF parsing failed: {e}")
 
 
+async def _analyse_upload(file: UploadFile) -> tuple[str, str, str]:
+    """Prepare an uploaded file and fan it out to every provider. Returns (claude, gemini, openai)."""
+    raw = await file.read()
+    try:
+        data_str = await asyncio.to_thread(prepare_input, raw, file.filename)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
+
+    # --- Fan out to each provider ---
+    claude_response, gemini_response, openai_response = await ask_all_providers(data_str)
+
+    # --- Debug log (formatted only when DEBUG is enabled) ---
+    logger.debug("claude=%s gemini=%s openai=%s", claude_response, gemini_response, openai_response)
+
+    return claude_response, gemini_response, openai_response
+
+
 @app.post("/analyse", tags=["llm"])
 async def analyse(file: UploadFile = File(...)):
     """
     Upload a file and send it to all configured LLM providers.
     Supports JSON and plain text files (txt capped at 1000 lines).
+    Returns {"filename", "claude", "gemini", "openai"} with each provider's markdown table.
+    """
+    claude_response, gemini_response, openai_response = await _analyse_upload(file)
+    return {
+        "filename": file.filename,
+        "claude": claude_response,
+        "gemini": gemini_response,
+        "openai": openai_response,
+    }
+
+
+@app.post("/analyse-html", tags=["llm"])
+async def analyse_html(file: UploadFile = File(...)):
+    """Same as /analyse but rendered as an HTML page (handy for eyeballing results in a browser)."""
+    claude_response, gemini_response, openai_response = await _analyse_upload(file)
+    return _render_results(file.filename, claude_response, gemini_response, openai_response)
+
+
+@app.post("/analyse-stream", tags=["llm"])
+async def analyse_stream(file: UploadFile = File(...)):
+    """
+    Like /analyse, but streams tokens as Server-Sent Events while the providers generate.
+    Each event is named after its provider ("claude" | "gemini" | "openai") with a JSON-encoded text chunk
+    as data; a final "done" event closes the stream.
     """
     raw = await file.read()
     try:
-        data_str = prepare_input(raw, file.filename)
+        data_str = await asyncio.to_thread(prepare_input, raw, file.filename)
     except (json.JSONDecodeError, UnicodeDecodeError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
 
-    # --- Fan out to each provider ---
-    claude_response = await ask_claude(data_str)
-    gemini_response = await ask_gemini(data_str)
-    openai_response = await ask_openai(data_str)
-
-    # --- Print to console for quick debugging ---
-    print("\n" + "=" * 60)
-    print("CLAUDE RESPONSE:")
-    print("-" * 60)
-    print(claude_response)
-    print("\n" + "=" * 60)
-    print("GEMINI RESPONSE:")
-    print("-" * 60)
-    print(gemini_response)
-    print("\n" + "=" * 60)
-    print("OPENAI RESPONSE:")
-    print("-" * 60)
-    print(openai_response)
-    print("=" * 60 + "\n")
+    data_str = fit_token_budget(data_str)
 
-    return _render_results(file.filename, claude_response, gemini_response, openai_response)
+    async def events():
+        for name in _SKIPPED_PROVIDERS.keys() - set(_ENABLED_PROVIDERS):
+            yield f"event: {name}\ndata: {orjson.dumps(_SKIPPED_PROVIDERS[name]).decode()}\n\n"
+        async for name, chunk in _merge_streams({name: _PROVIDER_STREAMS[name](data_str) for name in _ENABLED_PROVIDERS}):
+            yield f"event: {name}\ndata: {orjson.dumps(chunk).decode()}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@functools.lru_cache(maxsize=32)
+def _load_local_payload(filepath: str, mtime_ns: int) -> str:
+    """Read a local file through prepare_input. Cached per (path, mtime), so edits on disk invalidate it."""
+    return prepare_input_path(filepath)
 
 
 @app.post("/analyse-local", tags=["llm"])
@@ -1089,30 +1566,14 @@ async def analyse_local(filename: str = "john.json"):
     if not filepath.exists():
         raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
 
-    with open(filepath) as f:
-        data = json.load(f)
-
-    data = trim_transactions(data)
-    data = enrich_transactions_with_weekday(data)
-    data_str = json.dumps(data, indent=2)
-
-    claude_response = await ask_claude(data_str)
-    gemini_response = await ask_gemini(data_str)
-    openai_response = await ask_openai(data_str)
-
-    print("\n" + "=" * 60)
-    print("CLAUDE RESPONSE:")
-    print("-" * 60)
-    print(claude_response)
-    print("\n" + "=" * 60)
-    print("GEMINI RESPONSE:")
-    print("-" * 60)
-    print(gemini_response)
-    print("\n" + "=" * 60)
-    print("OPENAI RESPONSE:")
-    print("-" * 60)
-    print(openai_response)
-    print("=" * 60 + "\n")
+    try:
+        data_str = await asyncio.to_thread(_load_local_payload, str(filepath), filepath.stat().st_mtime_ns)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
+
+    claude_response, gemini_response, openai_response = await ask_all_providers(data_str)
+
+    logger.debug("claude=%s gemini=%s openai=%s", claude_response, gemini_response, openai_response)
 
     return _render_results(filename, claude_response, gemini_response, openai_response)
 
@@ -1133,12 +1594,11 @@ async def week_ahead_context_check(
     if debug:
         logging.getLogger().setLevel(logging.DEBUG)
     start = date.today() + timedelta(days=1)
-    from services.context_service import get_week_context_with_availability
     lat = float(lat) if lat is not None else (float(USER_LAT) if USER_LAT else None)
     lon = float(lon) if lon is not None else (float(USER_LON) if USER_LON else None)
     country = country_code or USER_COUNTRY
     subdivision = subdivision_code or USER_SUBDIVISION
-    day_context, metadata = get_week_context_with_availability(start, lat, lon, country, subdivision)
+    day_context, metadata = await get_week_context_with_availability(start, lat, lon, country, subdivision)
     summary = _build_context_summary(day_context)
     return {
         "day_context": day_context,
@@ -1167,7 +1627,7 @@ async def week_ahead(
     """
     raw = await file.read()
     try:
-        data_str = prepare_input(raw, file.filename or "file")
+        data_str = await asyncio.to_thread(prepare_input, raw, file.filename or "file")
     except (json.JSONDecodeError, UnicodeDecodeError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
 
@@ -1196,28 +1656,33 @@ async def budget_tips(text: str):
     return {"tips": tips}
 
 
-async def get_budget_tips(predictions: str) -> str:
-    """Send predicted expenditure to OpenAI and get budget-friendly tips."""
-    if not OPENAI_API_KEY:
-        return "[SKIPPED] OPENAI_API_KEY not set"
-
-    prompt = f"""Based on the following predicted spending patterns, provide 2-3 concise, actionable budget tips to save money. Keep each tip to 1 sentence. Focus on practical changes.
+def _budget_tips_prompt(predictions: str) -> str:
+    return f"""Based on the following predicted spending patterns, provide 2-3 concise, actionable budget tips to save money. Keep each tip to 1 sentence. Focus on practical changes.
 
 Predicted Spending:
 {predictions}
 
 Tips:"""
 
+
+@_cache_by_content_hash()
+async def get_budget_tips(predictions: str) -> str:
+    """Send predicted expenditure to OpenAI and get budget-friendly tips."""
+    if not OPENAI_API_KEY:
+        return "[SKIPPED] OPENAI_API_KEY not set"
+
+    prompt = _budget_tips_prompt(predictions)
+
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=150,
-            temperature=0.7,
-        )
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=150,
+                temperature=0.7,
+            )
         return response.choices[0].message.content
-    except Exception as e:
+    except _OPENAI_ERRORS as e:
         return f"[ERROR] Budget tips failed: {e}"
 
 
@@ -1229,7 +1694,7 @@ async def financial_summary_from_file(file: UploadFile = File(...)):
     """
     raw = await file.read()
     try:
-        data_str = prepare_input(raw, file.filename or "file")
+        data_str = await asyncio.to_thread(prepare_input, raw, file.filename or "file")
     except (json.JSONDecodeError, UnicodeDecodeError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
 
@@ -1257,30 +1722,27 @@ def _build_structured_financial_payload(contexts: list[dict]) -> str:
     return "\n".join(lines)
 
 
-async def generate_financial_summary(transaction_data: str) -> str:
+_FINANCIAL_SUMMARY_PARAMS = {"model": "gpt-4o-mini", "max_tokens": 500, "temperature": 0.2}
+
+
+def _plan_financial_summary(transaction_data: str) -> tuple[str | None, str | None, bool]:
     """
-    Generate account-type-aware financial summary. When JSON has statements/accounts,
-    use deterministic structured aggregation (analysis.summary) for explicit, reproducible output.
-    Otherwise fall back to LLM for raw/PDF/CSV text.
+    Decide how to summarise transaction_data. Returns (deterministic_summary, llm_prompt, has_credit):
+    exactly one of deterministic_summary / llm_prompt is set.
     """
     try:
-        data = json.loads(transaction_data)
+        data = orjson.loads(transaction_data)
     except (json.JSONDecodeError, TypeError):
         data = None
 
     if data and (data.get("statements") or data.get("accounts")):
-        from analysis.summary import build_account_summaries, format_summary_for_display
         summaries = build_account_summaries(data)
         if summaries:
-            return format_summary_for_display(summaries)
+            return format_summary_for_display(summaries), None, False
         # Empty accounts list: fall through to LLM
     else:
         data = None
 
-    # Non-JSON or no statements/accounts: use LLM (existing behaviour)
-    if not OPENAI_API_KEY:
-        return "[SKIPPED] OPENAI_API_KEY not set. Upload JSON with statements/accounts for deterministic summary."
-
     has_credit = False
     if data and data.get("statements"):
         contexts = build_financial_context(data)
@@ -1318,24 +1780,139 @@ If the data is from a current/savings account with clear income and expenses, yo
 Write 4–8 short lines. Only state what can be derived from the data; no fabricated estimates.
 
 Data:
-{transaction_data[:25000]}"""
+{fit_token_budget(transaction_data, 6250)}"""
+    return None, full_content, has_credit
+
+
+@_cache_by_content_hash()
+async def generate_financial_summary(transaction_data: str) -> str:
+    """
+    Generate account-type-aware financial summary. When JSON has statements/accounts,
+    use deterministic structured aggregation (analysis.summary) for explicit, reproducible output.
+    Otherwise fall back to LLM for raw/PDF/CSV text.
+    """
+    # JSON parse + aggregation is CPU-bound; keep it off the event loop
+    summary, full_content, has_credit = await asyncio.to_thread(_plan_financial_summary, transaction_data)
+    if summary is not None:
+        return summary
+
+    # Non-JSON or no statements/accounts: use LLM (existing behaviour)
+    if not OPENAI_API_KEY:
+        return "[SKIPPED] OPENAI_API_KEY not set. Upload JSON with statements/accounts for deterministic summary."
 
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": full_content}],
-            max_tokens=500,
-            temperature=0.2,
-        )
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                messages=[{"role": "user", "content": full_content}],
+                **_FINANCIAL_SUMMARY_PARAMS,
+            )
         out = response.choices[0].message.content
         if has_credit:
             out = _validate_credit_output(out)
         return out
-    except Exception as e:
+    except _OPENAI_ERRORS as e:
         return f"[ERROR] Financial summary failed: {e}"
 
 
+_BATCH_TERMINAL_STATUSES = frozenset(("completed", "failed", "expired", "cancelled"))
+
+
+async def batch_financial_summaries(texts: list[str], poll_interval: float = 30.0) -> list[str]:
+    """
+    Non-interactive variant of generate_financial_summary for many inputs (e.g. a nightly job).
+    Deterministic summaries are computed inline; the LLM prompts go through the OpenAI Batch API
+    (half price, no RPM pressure, completes within 24h). Polls until the batch finishes.
+    """
+    results: list[str | None] = []
+    pending: dict[str, tuple[int, bool]] = {}  # custom_id -> (index, has_credit)
+    request_lines = []
+    plans = await asyncio.to_thread(lambda: [_plan_financial_summary(text) for text in texts])
+    for i, (summary, full_content, has_credit) in enumerate(plans):
+        results.append(summary)
+        if summary is None:
+            custom_id = f"summary-{i}"
+            pending[custom_id] = (i, has_credit)
+            request_lines.append(orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"messages": [{"role": "user", "content": full_content}], **_FINANCIAL_SUMMARY_PARAMS},
+            }))
+    if not pending:
+        return results
+    if not OPENAI_API_KEY:
+        skipped = "[SKIPPED] OPENAI_API_KEY not set. Upload JSON with statements/accounts for deterministic summary."
+        return [r if r is not None else skipped for r in results]
+
+    failure = None
+    try:
+        batch_file = await _openai_client.files.create(
+            file=("financial_summaries.jsonl", b"\n".join(request_lines)),
+            purpose="batch",
+        )
+        batch = await _openai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        while batch.status not in _BATCH_TERMINAL_STATUSES:
+            await asyncio.sleep(poll_interval)
+            batch = await _openai_client.batches.retrieve(batch.id)
+        if batch.status == "completed" and batch.output_file_id:
+            output = await _openai_client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                record = orjson.loads(line)
+                if record.get("custom_id") not in pending:
+                    continue
+                i, has_credit = pending[record["custom_id"]]
+                choices = ((record.get("response") or {}).get("body") or {}).get("choices") or []
+                out = choices[0]["message"]["content"] if choices else None
+                if out:
+                    results[i] = _validate_credit_output(out) if has_credit else out
+        failure = f"[ERROR] Financial summary batch {batch.status}"
+    except _OPENAI_ERRORS as e:
+        failure = f"[ERROR] Financial summary batch failed: {e}"
+
+    return [r if r is not None else failure for r in results]
+
+
+@app.post("/financial-summary-batch", tags=["budget"])
+async def financial_summary_batch(files: list[UploadFile] = File(...)):
+    """
+    Financial summaries for several files via the OpenAI Batch API. Not for interactive use:
+    the request stays open until the batch completes (up to the 24h completion window).
+    """
+    texts = []
+    for file in files:
+        raw = await file.read()
+        try:
+            texts.append(await asyncio.to_thread(prepare_input, raw, file.filename or "file"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid file {file.filename}: {e}")
+
+    summaries = await batch_financial_summaries(texts)
+    return {"summaries": [{"filename": f.filename, "summary": s} for f, s in zip(files, summaries)]}
+
+
+@app.post("/financial-brief", tags=["budget"])
+async def financial_brief(text: str, file: UploadFile = File(...)):
+    """
+    Financial summary, budget tips and income runway from a single LLM call.
+    `text` is the predicted spending (as for /budget-tips); `file` is the transaction data.
+    """
+    if not text or not text.strip():
+        raise HTTPException(status_code=400, detail="Provide spending predictions as text")
+    raw = await file.read()
+    try:
+        data_str = await asyncio.to_thread(prepare_input, raw, file.filename or "file")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
+
+    return await full_financial_brief(data_str, text)
+
+
 @app.post("/income-runway", tags=["budget"])
 async def income_runway(text: str):
     """
@@ -1362,84 +1939,145 @@ def _summary_suggests_credit_card(text: str) -> bool:
     )
 
 
-async def get_income_runway(financial_summary: str) -> str:
-    """
-    Estimate runway only when the summary describes current/savings with positive cash.
-    If summary describes credit card debt, do not estimate months without income.
-    """
-    if not OPENAI_API_KEY:
-        return "[SKIPPED] OPENAI_API_KEY not set"
-
+def _income_runway_prompt(financial_summary: str) -> str:
     guardrail = (
         " If this summary describes credit card debt or outstanding balance as the primary balance, "
         "do NOT estimate months without income; instead state clearly that runway cannot be estimated from credit card data."
     )
-    prompt = f"""Based on the following financial summary, estimate how long this person can go without any new income (runway) only if the summary clearly describes liquid savings/current account balance and monthly expenses. Consider only savings, liquid assets, monthly expenses, and recurring income — not credit card balance.{guardrail}
+    return f"""Based on the following financial summary, estimate how long this person can go without any new income (runway) only if the summary clearly describes liquid savings/current account balance and monthly expenses. Consider only savings, liquid assets, monthly expenses, and recurring income — not credit card balance.{guardrail}
 
 Financial Summary:
 {financial_summary}
 
 Respond in 2-4 short sentences. If the data is from a credit card or does not support runway, say so and do not give a number of months. Otherwise give estimated runway and one brief note. Be concise."""
 
+
+def _validate_runway_output(financial_summary: str, out: str) -> str:
+    """Output validation: if summary suggests credit and response still claims runway, rewrite."""
+    if _summary_suggests_credit_card(financial_summary):
+        if "months without income" in out.lower() or ("month" in out.lower() and "runway" in out.lower()):
+            out = "Runway cannot be estimated from credit card data. The balance shown is outstanding debt, not savings; payments are repayments, not income."
+    return out
+
+
+@_cache_by_content_hash()
+async def get_income_runway(financial_summary: str) -> str:
+    """
+    Estimate runway only when the summary describes current/savings with positive cash.
+    If summary describes credit card debt, do not estimate months without income.
+    """
+    if not OPENAI_API_KEY:
+        return "[SKIPPED] OPENAI_API_KEY not set"
+
+    prompt = _income_runway_prompt(financial_summary)
+
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.3,
-        )
-        out = response.choices[0].message.content
-        # Output validation: if summary suggests credit and response still claims runway, rewrite
-        if _summary_suggests_credit_card(financial_summary):
-            if "months without income" in out.lower() or ("month" in out.lower() and "runway" in out.lower()):
-                out = "Runway cannot be estimated from credit card data. The balance shown is outstanding debt, not savings; payments are repayments, not income."
-        return out
-    except Exception as e:
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=200,
+                temperature=0.3,
+            )
+        return _validate_runway_output(financial_summary, response.choices[0].message.content)
+    except _OPENAI_ERRORS as e:
         return f"[ERROR] Income runway failed: {e}"
 
 
-def _render_results(filename: str, claude: str, gemini: str, openai: str) -> HTMLResponse:
-    """Render LLM responses as a readable HTML page with markdown rendering."""
-    import html
-    claude_escaped = html.escape(claude)
-    gemini_escaped = html.escape(gemini)
-    openai_escaped = html.escape(openai)
+_BRIEF_PROMPT = """\
+You are a personal finance assistant. Complete every task below independently and return ONLY a JSON object
+with exactly these string keys: {keys}. Each value is the plain-text answer to the matching task.
+"""
+
+
+async def full_financial_brief(transaction_data: str, predictions: str) -> dict:
+    """
+    Financial summary, budget tips and income runway in ONE chat completion (one RPM slot, one round-trip)
+    instead of three calls. Same prompts and output guardrails as the individual helpers.
+    """
+    summary, summary_prompt, has_credit = await asyncio.to_thread(_plan_financial_summary, transaction_data)
+    if not OPENAI_API_KEY:
+        skipped = "[SKIPPED] OPENAI_API_KEY not set"
+        return {"financial_summary": summary or skipped, "budget_tips": skipped, "income_runway": skipped}
 
-    page = f"""\
+    tasks = {}
+    if summary is None:
+        tasks["financial_summary"] = summary_prompt
+        runway_input = "(use the financial_summary you write for the financial_summary task)"
+    else:
+        runway_input = summary
+    tasks["budget_tips"] = _budget_tips_prompt(predictions)
+    tasks["income_runway"] = _income_runway_prompt(runway_input)
+
+    prompt = _BRIEF_PROMPT.format(keys=", ".join(f'"{k}"' for k in tasks)) + "".join(
+        f"\n=== Task: {k} ===\n{v}\n" for k, v in tasks.items()
+    )
+    try:
+        async with _SEM_OPENAI:
+            response = await _openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=900,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+    except _OPENAI_ERRORS as e:
+        error = f"[ERROR] Financial brief failed: {e}"
+        return {"financial_summary": summary or error, "budget_tips": error, "income_runway": error}
+
+    try:
+        answers = orjson.loads(response.choices[0].message.content or "")
+    except orjson.JSONDecodeError:
+        answers = {}
+    if not isinstance(answers, dict):
+        answers = {}
+    missing = "[ERROR] Financial brief response missing this field"
+    if summary is None:
+        summary = str(answers.get("financial_summary") or missing)
+        if has_credit:
+            summary = _validate_credit_output(summary)
+    return {
+        "financial_summary": summary,
+        "budget_tips": str(answers.get("budget_tips") or missing),
+        "income_runway": _validate_runway_output(summary, str(answers.get("income_runway") or missing)),
+    }
+
+
+# Static page shell, parsed once. _render_results streams the head, then one JS literal per provider, then the tail.
+_RESULTS_HEAD = string.Template("""\
 <!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
-  <title>Prophit — Analysis: {html.escape(filename)}</title>
+  <title>Prophit — Analysis: $filename</title>
   <script src="https://cdn.jsdelivr.net/npm/marked/marked.min.js"></script>
   <style>
-    * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-    body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-           background: #0d1117; color: #c9d1d9; padding: 2rem; }}
-    h1 {{ color: #58a6ff; margin-bottom: 0.5rem; }}
-    .subtitle {{ color: #8b949e; margin-bottom: 2rem; }}
-    .providers {{ display: flex; gap: 1.5rem; flex-wrap: wrap; }}
-    .provider {{ flex: 1; min-width: 300px; background: #161b22;
-                 border: 1px solid #30363d; border-radius: 8px; padding: 1.5rem; }}
-    .provider h2 {{ color: #58a6ff; border-bottom: 1px solid #30363d;
-                    padding-bottom: 0.5rem; margin-bottom: 1rem; }}
-    .provider.claude h2 {{ color: #d2a8ff; }}
-    .provider.gemini h2 {{ color: #7ee787; }}
-    .provider.openai h2 {{ color: #10a981; }}
-    .content {{ line-height: 1.6; }}
-    .content table {{ border-collapse: collapse; width: 100%; margin: 1rem 0; }}
-    .content th, .content td {{ border: 1px solid #30363d; padding: 8px 12px; text-align: left; }}
-    .content th {{ background: #21262d; color: #58a6ff; }}
-    .content h3 {{ color: #c9d1d9; margin-top: 1.5rem; margin-bottom: 0.5rem; }}
-    .content strong {{ color: #f0f6fc; }}
-    .content ul, .content ol {{ padding-left: 1.5rem; margin: 0.5rem 0; }}
-    .content hr {{ border: none; border-top: 1px solid #30363d; margin: 1.5rem 0; }}
+    * { margin: 0; padding: 0; box-sizing: border-box; }
+    body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+           background: #0d1117; color: #c9d1d9; padding: 2rem; }
+    h1 { color: #58a6ff; margin-bottom: 0.5rem; }
+    .subtitle { color: #8b949e; margin-bottom: 2rem; }
+    .providers { display: flex; gap: 1.5rem; flex-wrap: wrap; }
+    .provider { flex: 1; min-width: 300px; background: #161b22;
+                 border: 1px solid #30363d; border-radius: 8px; padding: 1.5rem; }
+    .provider h2 { color: #58a6ff; border-bottom: 1px solid #30363d;
+                    padding-bottom: 0.5rem; margin-bottom: 1rem; }
+    .provider.claude h2 { color: #d2a8ff; }
+    .provider.gemini h2 { color: #7ee787; }
+    .provider.openai h2 { color: #10a981; }
+    .content { line-height: 1.6; }
+    .content table { border-collapse: collapse; width: 100%; margin: 1rem 0; }
+    .content th, .content td { border: 1px solid #30363d; padding: 8px 12px; text-align: left; }
+    .content th { background: #21262d; color: #58a6ff; }
+    .content h3 { color: #c9d1d9; margin-top: 1.5rem; margin-bottom: 0.5rem; }
+    .content strong { color: #f0f6fc; }
+    .content ul, .content ol { padding-left: 1.5rem; margin: 0.5rem 0; }
+    .content hr { border: none; border-top: 1px solid #30363d; margin: 1.5rem 0; }
   </style>
 </head>
 <body>
   <h1>Prophit Analysis</h1>
-  <p class="subtitle">File: {html.escape(filename)}</p>
+  <p class="subtitle">File: $filename</p>
   <div class="providers">
     <div class="provider claude">
       <h2>Claude (Haiku 4.5)</h2>
@@ -1455,15 +2093,34 @@ def _render_results(filename: str, claude: str, gemini: str, openai: str) -> HTM
     </div>
   </div>
   <script>
-    const raw = {{
-      claude: `{claude_escaped}`,
-      gemini: `{gemini_escaped}`,
-      openai: `{openai_escaped}`,
-    }};
+    const raw = {
+""")
+_RESULTS_TAIL = """\
+    };
     document.getElementById('claude').innerHTML = marked.parse(raw.claude);
     document.getElementById('gemini').innerHTML = marked.parse(raw.gemini);
     document.getElementById('openai').innerHTML = marked.parse(raw.openai);
   </script>
 </body>
 </html>"""
-    return HTMLResponse(content=page)
+
+
+def _js_string(text: str) -> str:
+    """
+    Encode LLM markdown as a JS string literal for the inline <script>. JSON encoding handles backticks, ${ and
+    quotes; escaping <, > and & first means marked.parse never emits raw HTML from model output (and no
+    "</script>" can close the tag early). orjson keeps non-ASCII as UTF-8 rather than \\uXXXX escapes.
+    """
+    return orjson.dumps(html.escape(text, quote=False)).decode()
+
+
+def _render_results(filename: str, claude: str, gemini: str, openai: str) -> StreamingResponse:
+    """Render LLM responses as a readable HTML page with markdown rendering."""
+    def chunks():
+        # Head (styles, marked.js tag, provider containers) goes out before any response is encoded
+        yield _RESULTS_HEAD.substitute(filename=html.escape(filename))
+        for name, text in (("claude", claude), ("gemini", gemini), ("openai", openai)):
+            yield f"      {name}: {_js_string(text)},\n"
+        yield _RESULTS_TAIL
+
+    return StreamingResponse(chunks(), media_type="text/html; charset=utf-8")
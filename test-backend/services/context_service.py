@@ -6,9 +6,11 @@ Returns metadata: weather_ok, holiday_ok, context_available, location_source, us
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import time
+from collections import OrderedDict
 from datetime import date, timedelta
 from typing import Any
 
@@ -25,38 +27,92 @@ OPENHOLIDAYS_URL = "https://openholidaysapi.org/PublicHolidays"
 DEFAULT_LAT = 51.5
 DEFAULT_LON = -0.1
 
-# In-memory cache: key -> (payload, timestamp)
-_context_cache: dict[str, tuple[list[dict], float]] = {}
+# One pooled client for both APIs, so repeat lookups reuse keep-alive connections instead of new TLS handshakes.
+_http_client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_keepalive_connections=16))
+
+
+async def aclose_http_client() -> None:
+    """Close the shared HTTP client (call on app shutdown)."""
+    await _http_client.aclose()
+
+
+# In-memory cache: key -> (payload, expiry). Bounded LRU so unique locations/dates can't grow it forever.
+_context_cache: OrderedDict[str, tuple[Any, float]] = OrderedDict()
 CACHE_TTL_SECONDS = 10 * 60  # 10 minutes
+CACHE_MAX_ENTRIES = 10_000
+# One lock per in-flight cache key, so concurrent identical requests share a single fetch: key -> (lock, waiters)
+_context_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+
+def _cache_get(key: str) -> Any:
+    hit = _context_cache.get(key)
+    if hit is None:
+        return None
+    if hit[1] <= time.monotonic():
+        del _context_cache[key]
+        return None
+    _context_cache.move_to_end(key)
+    return hit[0]
+
+
+def _cache_set(key: str, payload: Any) -> None:
+    _context_cache[key] = (payload, time.monotonic() + CACHE_TTL_SECONDS)
+    _context_cache.move_to_end(key)
+    if len(_context_cache) > CACHE_MAX_ENTRIES:
+        _context_cache.popitem(last=False)
+
+
+async def _cached_fetch(cache_key: str, fetch, cacheable=lambda payload: True) -> Any:
+    """
+    Return the cached payload for cache_key, or await fetch() under a per-key lock so concurrent identical
+    requests share one fetch. Payloads for which cacheable(payload) is false are returned but not stored.
+    """
+    payload = _cache_get(cache_key)
+    if payload is not None:
+        return payload
+
+    lock, waiters = _context_locks.get(cache_key) or (asyncio.Lock(), 0)
+    _context_locks[cache_key] = (lock, waiters + 1)
+    try:
+        async with lock:
+            # Another request may have filled the cache while we waited
+            payload = _cache_get(cache_key)
+            if payload is None:
+                payload = await fetch()
+                if cacheable(payload):
+                    _cache_set(cache_key, payload)
+            return payload
+    finally:
+        # Only the last waiter drops the lock; earlier pops would let a late request start a second fetch
+        lock, waiters = _context_locks[cache_key]
+        if waiters == 1:
+            del _context_locks[cache_key]
+        else:
+            _context_locks[cache_key] = (lock, waiters - 1)
+
+
+# WMO weather code -> short condition summary; codes not listed map to "Cloudy"
+_WMO_SUMMARIES = {
+    0: "Clear",
+    **dict.fromkeys((1, 2, 3), "Partly cloudy"),
+    **dict.fromkeys((45, 48), "Foggy"),
+    **dict.fromkeys((51, 53, 55, 56, 57), "Drizzle"),
+    **dict.fromkeys((61, 63, 65, 66, 67), "Rainy"),
+    **dict.fromkeys((71, 73, 75, 77), "Snow"),
+    **dict.fromkeys((80, 81, 82), "Rain showers"),
+    **dict.fromkeys((85, 86), "Snow showers"),
+    **dict.fromkeys((95, 96, 99), "Thunderstorm"),
+}
 
 
 def _weathercode_to_summary(code: int) -> str:
     """Map WMO weather code to short condition summary."""
     if code is None:
         return "Unknown"
-    c = int(code)
-    if c == 0:
-        return "Clear"
-    if c in (1, 2, 3):
-        return "Partly cloudy"
-    if c in (45, 48):
-        return "Foggy"
-    if c in (51, 53, 55, 56, 57):
-        return "Drizzle"
-    if c in (61, 63, 65, 66, 67):
-        return "Rainy"
-    if c in (71, 73, 75, 77):
-        return "Snow"
-    if c in (80, 81, 82):
-        return "Rain showers"
-    if c in (85, 86):
-        return "Snow showers"
-    if c in (95, 96, 99):
-        return "Thunderstorm"
-    return "Cloudy"
-
-
-def fetch_weather_open_meteo(
+    return _WMO_SUMMARIES.get(int(code), "Cloudy")
+
+
+async def fetch_weather_open_meteo(
     lat: float,
     lon: float,
     start_date: date,
@@ -79,36 +135,35 @@ def fetch_weather_open_meteo(
         extra={"url": OPEN_METEO_URL, "params": params},
     )
     try:
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get(OPEN_METEO_URL, params=params)
-            logger.info(
-                "Open-Meteo response",
-                extra={"status_code": r.status_code, "content_length": len(r.text)},
-            )
-            if r.status_code != 200:
-                logger.error(
-                    "Open-Meteo non-200 response",
-                    extra={
-                        "status_code": r.status_code,
-                        "body_preview": (r.text or "")[:300],
-                    },
-                )
-            r.raise_for_status()
-            weather_json = r.json()
-            logger.info(
-                "Parsed weather payload",
+        r = await _http_client.get(OPEN_METEO_URL, params=params)
+        logger.info(
+            "Open-Meteo response",
+            extra={"status_code": r.status_code, "content_length": len(r.text)},
+        )
+        if r.status_code != 200:
+            logger.error(
+                "Open-Meteo non-200 response",
                 extra={
-                    "keys": list(weather_json.keys()),
-                    "daily_keys": list(weather_json.get("daily", {}).keys()),
+                    "status_code": r.status_code,
+                    "body_preview": (r.text or "")[:300],
                 },
             )
-            return weather_json
+        r.raise_for_status()
+        weather_json = r.json()
+        logger.info(
+            "Parsed weather payload",
+            extra={
+                "keys": list(weather_json.keys()),
+                "daily_keys": list(weather_json.get("daily", {}).keys()),
+            },
+        )
+        return weather_json
     except Exception:
         logger.exception("Open-Meteo request failed")
         return None
 
 
-def fetch_holidays_openholidays(
+async def fetch_holidays_openholidays(
     country_code: str,
     start_date: date,
     end_date: date,
@@ -138,64 +193,82 @@ def fetch_holidays_openholidays(
         },
     )
     try:
-        with httpx.Client(timeout=10.0) as client:
-            r = client.get(OPENHOLIDAYS_URL, params=params, headers={"accept": "application/json"})
-            logger.info(
-                "OpenHolidaysAPI response",
-                extra={"status_code": r.status_code, "content_length": len(r.text)},
-            )
-            if r.status_code != 200:
-                logger.error(
-                    "OpenHolidaysAPI non-200 response",
-                    extra={
-                        "status_code": r.status_code,
-                        "body_preview": (r.text or "")[:300],
-                    },
-                )
-                return [], f"API returned {r.status_code}"
-            r.raise_for_status()
-            data = r.json()
-            holiday_list = data if isinstance(data, list) else []
-            logger.info(
-                "Parsed holiday payload",
-                extra={"holiday_count": len(holiday_list) if isinstance(holiday_list, list) else None},
+        r = await _http_client.get(OPENHOLIDAYS_URL, params=params, headers={"accept": "application/json"})
+        logger.info(
+            "OpenHolidaysAPI response",
+            extra={"status_code": r.status_code, "content_length": len(r.text)},
+        )
+        if r.status_code != 200:
+            logger.error(
+                "OpenHolidaysAPI non-200 response",
+                extra={
+                    "status_code": r.status_code,
+                    "body_preview": (r.text or "")[:300],
+                },
             )
-            return holiday_list, None
+            return [], f"API returned {r.status_code}"
+        r.raise_for_status()
+        data = r.json()
+        holiday_list = data if isinstance(data, list) else []
+        logger.info(
+            "Parsed holiday payload",
+            extra={"holiday_count": len(holiday_list) if isinstance(holiday_list, list) else None},
+        )
+        return holiday_list, None
     except Exception as e:
         logger.exception("OpenHolidaysAPI request failed")
         return [], str(e)
 
 
-def _holiday_for_date(holidays: list[dict], d: date) -> dict:
+_WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+_NO_HOLIDAY = {
+    "holiday_status": "ok",
+    "is_holiday": False,
+    "holiday_name": None,
+    "holiday_error": None,
+}
+
+
+def _holiday_name(h: dict) -> str:
+    name_list = h.get("name") or []
+    name = None
+    for n in name_list:
+        if isinstance(n, dict) and n.get("text"):
+            name = n.get("text")
+            break
+    if not name and name_list:
+        name = name_list[0].get("text") if isinstance(name_list[0], dict) else str(name_list[0])
+    return name or "Public Holiday"
+
+
+def _holidays_by_date(holidays: list[dict], first: date, last: date) -> dict[str, dict]:
     """
-    Return holiday block for one day when holiday_status is "ok".
-    Keys: holiday_status="ok", is_holiday (bool), holiday_name (str|null), holiday_error (null).
+    Bucket holidays into ISO date -> holiday block for days in [first, last], in one pass over holidays.
+    Block keys: holiday_status="ok", is_holiday=True, holiday_name (str), holiday_error (null).
+    The first holiday listed for a date wins. Days without a holiday are absent; use _NO_HOLIDAY for them.
     """
-    d_str = d.isoformat()
+    by_date: dict[str, dict] = {}
     for h in holidays:
-        start = h.get("startDate") or ""
-        end = h.get("endDate") or start
-        if start <= d_str <= end:
-            name_list = h.get("name") or []
-            name = None
-            for n in name_list:
-                if isinstance(n, dict) and n.get("text"):
-                    name = n.get("text")
-                    break
-            if not name and name_list:
-                name = name_list[0].get("text") if isinstance(name_list[0], dict) else str(name_list[0])
-            return {
-                "holiday_status": "ok",
-                "is_holiday": True,
-                "holiday_name": name or "Public Holiday",
-                "holiday_error": None,
-            }
-    return {
-        "holiday_status": "ok",
-        "is_holiday": False,
-        "holiday_name": None,
-        "holiday_error": None,
-    }
+        try:
+            start = date.fromisoformat(h.get("startDate") or "")
+            end = date.fromisoformat(h.get("endDate") or h.get("startDate"))
+        except (TypeError, ValueError):
+            continue
+        d = max(start, first)
+        stop = min(end, last)
+        if d > stop:
+            continue
+        block = {
+            "holiday_status": "ok",
+            "is_holiday": True,
+            "holiday_name": _holiday_name(h),
+            "holiday_error": None,
+        }
+        while d <= stop:
+            by_date.setdefault(d.isoformat(), block)
+            d += timedelta(days=1)
+    return by_date
 
 
 def _holiday_block_unavailable(status: str, error: str | None) -> dict:
@@ -221,9 +294,10 @@ def _build_day_context_list(
     - holiday: holiday_status ("ok"|"missing"|"error"), is_holiday (bool|null), holiday_name, holiday_error
     """
     end_date = start_date + timedelta(days=6)
-    week_dates = [start_date + timedelta(days=i) for i in range(7)]
-    weekday_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     weather_status_day = "ok" if weather_data is not None else "error"
+    # No data for a day: "missing" when fetch succeeded, else "error"
+    missing_weather_status = "missing" if weather_status_day == "ok" else weather_status_day
+    first_weekday = start_date.weekday()
     daily = (weather_data or {}).get("daily") or {}
     times = daily.get("time") or []
     temp_max = daily.get("temperature_2m_max") or []
@@ -233,11 +307,16 @@ def _build_day_context_list(
     # Open-Meteo JSON uses weather_code; support weathercode for tests/mocks
     weathercode = daily.get("weather_code") or daily.get("weathercode") or []
 
+    # Index lookups per day instead of rescanning the weather and holiday lists
+    time_to_idx = {t: j for j, t in reversed(list(enumerate(times)))}
+    holidays_ok = holiday_status == "ok" and holidays_data is not None
+    holiday_by_date = _holidays_by_date(holidays_data, start_date, end_date) if holidays_ok else {}
+
     result = []
-    for i, d in enumerate(week_dates):
-        d_str = d.isoformat()
-        weekday = weekday_names[d.weekday()]
-        w_idx = next((j for j, t in enumerate(times) if t == d_str), None)
+    for i in range(7):
+        d_str = (start_date + timedelta(days=i)).isoformat()
+        weekday = _WEEKDAY_NAMES[(first_weekday + i) % 7]
+        w_idx = time_to_idx.get(d_str)
         if weather_status_day == "ok" and w_idx is not None:
             weather = {
                 "weather_status": "ok",
@@ -248,18 +327,16 @@ def _build_day_context_list(
                 "condition_summary": _weathercode_to_summary(weathercode[w_idx] if weathercode else None),
             }
         else:
-            # No data for this day: "missing" when fetch succeeded, else "error"
-            day_weather_status = "missing" if weather_status_day == "ok" else weather_status_day
             weather = {
-                "weather_status": day_weather_status,
+                "weather_status": missing_weather_status,
                 "precip_probability": None,
                 "precip_mm": None,
                 "temp_min_c": None,
                 "temp_max_c": None,
                 "condition_summary": None,
             }
-        if holiday_status == "ok" and holidays_data is not None:
-            holiday = _holiday_for_date(holidays_data, d)
+        if holidays_ok:
+            holiday = dict(holiday_by_date.get(d_str, _NO_HOLIDAY))
         else:
             holiday = _holiday_block_unavailable(holiday_status, holiday_error)
         result.append({"date": d_str, "weekday": weekday, "weather": weather, "holiday": holiday})
@@ -276,7 +353,7 @@ def _build_day_context_list(
     return result
 
 
-def get_week_context(
+async def get_week_context(
     start_date: date,
     lat: float,
     lon: float,
@@ -299,16 +376,24 @@ def get_week_context(
         },
     )
     cache_key = f"{lat:.4f}_{lon:.4f}_{country_code}_{subdivision_code or ''}_{start_date.isoformat()}"
-    now = time.time()
-    if cache_key in _context_cache:
-        payload, ts = _context_cache[cache_key]
-        if now - ts < CACHE_TTL_SECONDS:
-            return payload
-        del _context_cache[cache_key]
+    return await _cached_fetch(
+        cache_key, lambda: _fetch_week_context(start_date, lat, lon, country_code, subdivision_code)
+    )
+
 
+async def _fetch_week_context(
+    start_date: date,
+    lat: float,
+    lon: float,
+    country_code: str,
+    subdivision_code: str | None,
+) -> list[dict]:
+    """Fetch weather and holidays concurrently and build the 7 day_context objects (uncached)."""
     end_date = start_date + timedelta(days=6)
-    weather_data = fetch_weather_open_meteo(lat, lon, start_date, end_date)
-    holidays_data, h_err = fetch_holidays_openholidays(country_code, start_date, end_date, subdivision_code)
+    weather_data, (holidays_data, h_err) = await asyncio.gather(
+        fetch_weather_open_meteo(lat, lon, start_date, end_date),
+        fetch_holidays_openholidays(country_code, start_date, end_date, subdivision_code),
+    )
     if not isinstance(holidays_data, list):
         holidays_data = []
     if h_err:
@@ -331,11 +416,10 @@ def get_week_context(
             "total_days": len(result),
         },
     )
-    _context_cache[cache_key] = (result, now)
     return result
 
 
-def get_week_context_with_availability(
+async def get_week_context_with_availability(
     start_date: date,
     lat: float | None,
     lon: float | None,
@@ -347,7 +431,6 @@ def get_week_context_with_availability(
     metadata: weather_ok, holiday_ok, context_available, location_source, used_default_location, context_errors.
     context_available := weather_ok OR holiday_ok (either provides real signal).
     """
-    context_errors: list[str] = []
     user_lat = os.getenv("USER_LAT")
     user_lon = os.getenv("USER_LON")
     user_country = (os.getenv("USER_COUNTRY") or "").strip().upper()[:2] or None
@@ -380,7 +463,42 @@ def get_week_context_with_availability(
         and not (user_lat and user_lon)
     )
 
-    # Holiday fetch: only when we have a country
+    # Keyed on the resolved location, so request/env/default inputs that resolve the same share an entry
+    cache_key = (
+        f"avail_{use_lat:.4f}_{use_lon:.4f}_{use_country or ''}_{subdivision_code or ''}_{start_date.isoformat()}"
+    )
+    contexts, fetch_metadata = await _cached_fetch(
+        cache_key,
+        lambda: _fetch_week_context_with_availability(start_date, use_lat, use_lon, use_country, subdivision_code),
+        # Transient failures (weather fetch, holiday API error) are retried on the next request, not cached
+        cacheable=lambda payload: payload[1]["weather_ok"] and payload[1]["holiday_status"] != "error",
+    )
+    metadata = {
+        **fetch_metadata,
+        "context_errors": list(fetch_metadata["context_errors"]),
+        "location_source": location_source,
+        "used_default_location": used_default_location,
+    }
+    return contexts, metadata
+
+
+async def _fetch_week_context_with_availability(
+    start_date: date,
+    use_lat: float,
+    use_lon: float,
+    use_country: str | None,
+    subdivision_code: str | None,
+) -> tuple[list[dict], dict]:
+    """Fetch and build the 7 day_context objects plus fetch-derived metadata for a resolved location (uncached)."""
+    context_errors: list[str] = []
+    # Weather always (we have lat/lon from request, env, or default); holidays only when we have a country.
+    # Both requests run concurrently.
+    end_date = start_date + timedelta(days=6)
+    fetches = [fetch_weather_open_meteo(use_lat, use_lon, start_date, end_date)]
+    if use_country:
+        fetches.append(fetch_holidays_openholidays(use_country, start_date, end_date, subdivision_code))
+    weather_result, *holiday_result = await asyncio.gather(*fetches, return_exceptions=True)
+
     holidays_data: list[dict] = []
     holiday_ok = False
     holiday_status: str = "missing"
@@ -389,32 +507,27 @@ def get_week_context_with_availability(
         context_errors.append("holiday unavailable: missing country code")
         holiday_status = "missing"
         holiday_error = "missing country code"
+    elif isinstance(holiday_result[0], Exception):
+        e = holiday_result[0]
+        context_errors.append(f"holiday: {str(e)}")
+        holiday_status = "error"
+        holiday_error = str(e)
     else:
-        try:
-            end_date = start_date + timedelta(days=6)
-            holidays_data, err = fetch_holidays_openholidays(
-                use_country, start_date, end_date, subdivision_code
-            )
-            if err:
-                context_errors.append(f"holiday: {err}")
-                holiday_status = "missing" if "missing" in (err or "").lower() else "error"
-                holiday_error = err
-            else:
-                holiday_ok = True
-                holiday_status = "ok"
-                holiday_error = None
-        except Exception as e:
-            context_errors.append(f"holiday: {str(e)}")
-            holiday_status = "error"
-            holiday_error = str(e)
-
-    # Weather fetch: always (we have lat/lon from request, env, or default)
+        holidays_data, err = holiday_result[0]
+        if err:
+            context_errors.append(f"holiday: {err}")
+            holiday_status = "missing" if "missing" in (err or "").lower() else "error"
+            holiday_error = err
+        else:
+            holiday_ok = True
+            holiday_status = "ok"
+            holiday_error = None
+
     weather_data = None
-    try:
-        end_date = start_date + timedelta(days=6)
-        weather_data = fetch_weather_open_meteo(use_lat, use_lon, start_date, end_date)
-    except Exception as e:
-        context_errors.append(f"weather: {str(e)}")
+    if isinstance(weather_result, Exception):
+        context_errors.append(f"weather: {str(weather_result)}")
+    else:
+        weather_data = weather_result
 
     if weather_data is None:
         context_errors.append("weather: fetch failed")
@@ -450,8 +563,6 @@ def get_week_context_with_availability(
         "holiday_error": holiday_error,
         "context_available": context_used,
         "context_used": context_used,
-        "location_source": location_source,
-        "used_default_location": used_default_location,
         "context_errors": context_errors,
     }
     return contexts, metadata
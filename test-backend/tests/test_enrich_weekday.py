@@ -0,0 +1,21 @@
+"""Tests for main.enrich_transactions_with_weekday."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import enrich_transactions_with_weekday
+
+
+def test_weekday_added_for_valid_timestamps_only():
+    txns = [
+        {"timestamp": "2024-05-01T09:30:00Z"},
+        {"timestamp": "2024-05-01T09:30:00Z"},
+        {"timestamp": "2024-05-04"},
+        {"timestamp": "2024-05-01Tgarbage"},
+        {"timestamp": None},
+        {"amount": 1.0},
+    ]
+    enrich_transactions_with_weekday({"statements": [{"transactions": txns}]})
+    assert [t.get("day_of_week") for t in txns] == ["Wednesday", "Wednesday", "Saturday", None, None, None]
@@ -0,0 +1,93 @@
+"""Tests for main's content-hash LLM response cache."""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import _cache_by_content_hash
+
+
+def test_cache_hits_on_same_input_and_skips_errors():
+    calls = []
+
+    @_cache_by_content_hash(maxsize=2)
+    async def fake_llm(text: str) -> str:
+        calls.append(text)
+        return "[ERROR] boom" if text == "bad" else f"tips for {text}"
+
+    async def run():
+        assert await fake_llm("coffee") == "tips for coffee"
+        assert await fake_llm("coffee") == "tips for coffee"
+        await fake_llm("bad")
+        await fake_llm("bad")
+
+    asyncio.run(run())
+    # Success cached after the first call; errors are never cached
+    assert calls == ["coffee", "bad", "bad"]
+
+
+def test_cache_evicts_least_recently_used():
+    calls = []
+
+    @_cache_by_content_hash(maxsize=2)
+    async def fake_llm(text: str) -> str:
+        calls.append(text)
+        return text.upper()
+
+    async def run():
+        for t in ("a", "b", "a", "c", "a", "b"):
+            await fake_llm(t)
+
+    asyncio.run(run())
+    # "b" was least recently used when "c" was inserted, so it is fetched again
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_cache_entries_expire_after_ttl():
+    calls = []
+
+    @_cache_by_content_hash(ttl=0.05)
+    async def fake_llm(text: str) -> str:
+        calls.append(text)
+        return text.upper()
+
+    async def run():
+        await fake_llm("a")
+        await fake_llm("a")
+        time.sleep(0.06)
+        await fake_llm("a")
+
+    asyncio.run(run())
+    assert calls == ["a", "a"]
+
+
+def test_disk_cache_survives_a_fresh_wrapper():
+    calls = []
+
+    async def fake_llm(text: str) -> str:
+        calls.append(text)
+        return text.upper()
+
+    with tempfile.TemporaryDirectory() as d:
+        first = _cache_by_content_hash(disk_dir=Path(d))(fake_llm)
+        # A second wrapper has an empty memory cache, like a restarted process
+        second = _cache_by_content_hash(disk_dir=Path(d))(fake_llm)
+
+        async def run():
+            assert await first("a") == "A"
+            assert await second("a") == "A"
+
+        asyncio.run(run())
+    assert calls == ["a"]
+
+
+if __name__ == "__main__":
+    test_cache_hits_on_same_input_and_skips_errors()
+    test_cache_evicts_least_recently_used()
+    test_cache_entries_expire_after_ttl()
+    test_disk_cache_survives_a_fresh_wrapper()
+    print("All tests passed.")
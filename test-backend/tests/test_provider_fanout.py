@@ -0,0 +1,66 @@
+"""Tests for main.ask_all_providers concurrent fan-out."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main
+
+
+def _with_fake_providers(calls, enabled, fn):
+    saved = main._PROVIDER_CALLS, main._ENABLED_PROVIDERS
+    main._PROVIDER_CALLS, main._ENABLED_PROVIDERS = calls, enabled
+    try:
+        return asyncio.run(fn())
+    finally:
+        main._PROVIDER_CALLS, main._ENABLED_PROVIDERS = saved
+
+
+def test_providers_run_concurrently_and_errors_become_strings():
+    in_flight = 0
+    peak = 0
+
+    async def slow(name):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Yield so the other provider calls get scheduled before this one finishes
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"{name} ok"
+
+    async def boom(_data):
+        raise RuntimeError("down")
+
+    calls = {
+        "claude": lambda d: slow("claude"),
+        "gemini": boom,
+        "openai": lambda d: slow("openai"),
+    }
+    claude, gemini, openai = _with_fake_providers(
+        calls, ("claude", "gemini", "openai"), lambda: main.ask_all_providers("{}")
+    )
+
+    assert claude == "claude ok" and openai == "openai ok"
+    assert gemini == "[ERROR] RuntimeError: down"
+    # Both slow calls were in flight at once, not back to back
+    assert peak == 2
+
+
+def test_disabled_providers_keep_skipped_message():
+    async def ok(_data):
+        return "ok"
+
+    claude, gemini, openai = _with_fake_providers(
+        {"claude": ok}, ("claude",), lambda: main.ask_all_providers("{}")
+    )
+    assert claude == "ok"
+    assert gemini.startswith("[SKIPPED]")
+
+
+if __name__ == "__main__":
+    test_providers_run_concurrently_and_errors_become_strings()
+    test_disabled_providers_keep_skipped_message()
+    print("All tests passed.")
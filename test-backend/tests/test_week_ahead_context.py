@@ -1,7 +1,8 @@
 """Tests for context-aware week-ahead: context builder, prompt includes day_context, resilience when API fails."""
 
+import asyncio
 import sys
-from datetime import date
+from datetime import date, timedelta
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -17,7 +18,7 @@ from services.context_service import (
 
 def test_context_builder_returns_seven_days():
     start = date(2026, 2, 22)
-    contexts = get_week_context(start, 51.5, -0.1, "GB", None)
+    contexts = asyncio.run(get_week_context(start, 51.5, -0.1, "GB", None))
     assert len(contexts) == 7
     for i, dc in enumerate(contexts):
         assert "date" in dc
@@ -61,7 +62,7 @@ def test_holiday_marked_when_mocked():
                 ],
                 None,
             )
-            contexts = get_week_context(start, 51.5, -0.1, "DE", None)
+            contexts = asyncio.run(get_week_context(start, 51.5, -0.1, "DE", None))
     assert len(contexts) == 7
     dec_25 = next((c for c in contexts if c["date"] == "2026-12-25"), None)
     assert dec_25 is not None
@@ -77,7 +78,7 @@ def test_weather_api_fail_returns_context_unavailable():
     ctx_mod._context_cache.clear()
     with patch.object(ctx_mod, "fetch_weather_open_meteo", return_value=None):
         with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], "network error")):
-            contexts, metadata = get_week_context_with_availability(start, 51.5, -0.1, "GB", None)
+            contexts, metadata = asyncio.run(get_week_context_with_availability(start, 51.5, -0.1, "GB", None))
     assert len(contexts) == 7
     assert metadata.get("context_available") is False
     assert metadata.get("weather_ok") is False
@@ -105,7 +106,7 @@ def test_holiday_api_fail_shows_error_status_and_null_is_holiday():
             }
         }
         with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], "500 Internal Server Error")):
-            contexts, metadata = get_week_context_with_availability(start, 51.5, -0.1, "GB", None)
+            contexts, metadata = asyncio.run(get_week_context_with_availability(start, 51.5, -0.1, "GB", None))
     assert metadata.get("holiday_status") == "error"
     assert metadata.get("holiday_error") == "500 Internal Server Error"
     for dc in contexts:
@@ -136,7 +137,7 @@ def test_holiday_success_no_holiday_shows_not_a_holiday():
             }
         }
         with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], None)):
-            contexts, metadata = get_week_context_with_availability(start, 51.5, -0.1, "GB", None)
+            contexts, metadata = asyncio.run(get_week_context_with_availability(start, 51.5, -0.1, "GB", None))
     assert metadata.get("holiday_status") == "ok"
     for dc in contexts:
         h = dc.get("holiday") or {}
@@ -186,7 +187,7 @@ def test_default_location_weather_ok_context_available():
                 }
             }
             with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], None)):
-                contexts, metadata = get_week_context_with_availability(start, None, None, None, None)
+                contexts, metadata = asyncio.run(get_week_context_with_availability(start, None, None, None, None))
     finally:
         if old_lat is not None:
             os.environ["USER_LAT"] = old_lat
@@ -201,6 +202,111 @@ def test_default_location_weather_ok_context_available():
     assert any("country" in e.lower() for e in (metadata.get("context_errors") or []))
 
 
+def test_concurrent_identical_requests_fetch_once():
+    """Parallel get_week_context calls for the same key share one fetch; the second is served from cache."""
+    import services.context_service as ctx_mod
+    ctx_mod._context_cache.clear()
+    start = date(2026, 3, 2)
+
+    async def slow_weather(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return None
+
+    async def run():
+        return await asyncio.gather(
+            get_week_context(start, 51.5, -0.1, "GB", None),
+            get_week_context(start, 51.5, -0.1, "GB", None),
+        )
+
+    with patch.object(ctx_mod, "fetch_weather_open_meteo", side_effect=slow_weather) as mock_weather:
+        with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], None)):
+            first, second = asyncio.run(run())
+    assert mock_weather.await_count == 1
+    assert first is second
+    assert not ctx_mod._context_locks
+
+
+def test_concurrent_availability_requests_fetch_once():
+    """The production path (get_week_context_with_availability) shares one fetch across identical parallel calls."""
+    import services.context_service as ctx_mod
+    ctx_mod._context_cache.clear()
+    start = date(2026, 3, 9)
+
+    async def slow_weather(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return {"daily": {"time": [(start + timedelta(days=i)).isoformat() for i in range(7)], "weathercode": [0] * 7}}
+
+    async def run():
+        return await asyncio.gather(
+            get_week_context_with_availability(start, 51.5, -0.1, "GB", None),
+            get_week_context_with_availability(start, 51.5, -0.1, "GB", None),
+        )
+
+    with patch.object(ctx_mod, "fetch_weather_open_meteo", side_effect=slow_weather) as mock_weather:
+        with patch.object(ctx_mod, "fetch_holidays_openholidays", return_value=([], None)):
+            (first, first_meta), (second, second_meta) = asyncio.run(run())
+            # Served from cache afterwards
+            asyncio.run(get_week_context_with_availability(start, 51.5, -0.1, "GB", None))
+    assert mock_weather.await_count == 1
+    assert first is second
+    assert first_meta["weather_ok"] is True and first_meta == second_meta
+    assert not ctx_mod._context_locks
+
+
+def test_late_request_reuses_lock_while_others_wait():
+    """A request arriving after the first fetch finishes queues on the same lock instead of fetching in parallel."""
+    import services.context_service as ctx_mod
+    ctx_mod._context_cache.clear()
+    in_flight = peak = 0
+
+    async def fetch():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return "payload"
+
+    async def late():
+        await asyncio.sleep(0.015)
+        return await ctx_mod._cached_fetch("k", fetch, cacheable=lambda payload: False)
+
+    async def run():
+        return await asyncio.gather(
+            ctx_mod._cached_fetch("k", fetch, cacheable=lambda payload: False),
+            ctx_mod._cached_fetch("k", fetch, cacheable=lambda payload: False),
+            late(),
+        )
+
+    assert asyncio.run(run()) == ["payload"] * 3
+    assert peak == 1
+    assert not ctx_mod._context_locks
+
+
+def test_combine_pattern_tables_drops_failed_providers():
+    """Error/skipped/empty pattern tables are not forwarded to candidates; all failed => empty string."""
+    from main import _combine_pattern_tables
+    combined = _combine_pattern_tables(
+        (("Claude", "| Monday | Coffee |"), ("Gemini", "[ERROR] Gemini failed: 429"), ("OpenAI", ""))
+    )
+    assert combined == "=== Claude ===\n| Monday | Coffee |"
+    assert _combine_pattern_tables((("Claude", "[SKIPPED] no key"), ("OpenAI", "[ERROR] boom"))) == ""
+
+
+def test_gemini_candidate_network_error_becomes_error_string():
+    """A Gemini transport failure (raw httpx error from the SDK) is reported, not raised through the pipeline."""
+    import httpx
+    import main
+
+    async def unreachable(*args, **kwargs):
+        raise httpx.ConnectError("connection refused")
+
+    with patch.object(main, "GEMINI_API_KEY", "test-key"), patch.object(main, "_gemini_generate", side_effect=unreachable):
+        out = asyncio.run(main._ask_calendar_candidate_gemini("{}", "", "[]", "2026-02-22", ""))
+    assert out.startswith("[ERROR]")
+    assert "connection refused" in out
+
+
 if __name__ == "__main__":
     test_context_builder_returns_seven_days()
     test_holiday_marked_when_mocked()
@@ -209,4 +315,8 @@ if __name__ == "__main__":
     test_holiday_success_no_holiday_shows_not_a_holiday()
     test_prompt_builder_includes_day_context()
     test_default_location_weather_ok_context_available()
+    test_concurrent_identical_requests_fetch_once()
+    test_concurrent_availability_requests_fetch_once()
+    test_combine_pattern_tables_drops_failed_providers()
+    test_gemini_candidate_network_error_becomes_error_string()
     print("All tests passed.")
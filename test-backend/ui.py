@@ -6,222 +6,416 @@ Run:
 """
 
 import asyncio
-import json
+import atexit
+import concurrent.futures
+import functools
+import hashlib
+import io
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 import gradio as gr
-
-from main import (
-    ask_claude,
-    ask_gemini,
-    ask_openai,
-    ask_claude_calendar,
-    prepare_input,
-    get_budget_tips,
-    get_income_runway,
-    generate_financial_summary,
-    run_week_ahead_pipeline,
-    parse_pdf_to_transactions,
-)
+import orjson
 
 DATA_DIR = Path(__file__).parent.parent / "backend" / "data"
 
+# One long-lived event loop for all callbacks: main's shared async SDK clients keep
+# connection pools bound to the loop that first used them, so asyncio.run per click won't do.
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="ui-asyncio", daemon=True).start()
+
+
+def _run(coro):
+    """Run a coroutine on the shared background loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _LOOP).result()
+
+
+async def _arun(coro):
+    """Await a coroutine scheduled on the shared background loop, from an async Gradio handler."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _LOOP))
+
+
+def _main():
+    """
+    The backend module, imported on first use rather than at startup: it pulls in the whole LLM SDK stack,
+    and the UI can bind its port without waiting for that. After the first call this is a sys.modules hit.
+    """
+    import main
+    return main
+
+
+@atexit.register
+def _close_backend_clients() -> None:
+    # Close main's shared HTTP pools on the loop that owns them; FastAPI's shutdown
+    # hook doesn't run under Gradio. Nothing to do if no handler ever imported main.
+    if "main" in sys.modules:
+        _run(sys.modules["main"]._close_shared_clients())
+
+
+async def _prewarm() -> None:
+    # Import the backend off the loop, then open provider connections while the UI is still rendering
+    backend = await asyncio.to_thread(_main)
+    await backend._warm_llm_connections()
+
+
+# Opt-in: it pays the backend import and provider handshakes up front, even if nobody clicks.
+# Best effort; a failure just means the first click connects itself.
+_PREWARM = os.getenv("PROPHIT_PREWARM") == "1"
+if _PREWARM:
+    asyncio.run_coroutine_threadsafe(_prewarm(), _LOOP)
+
+
+def _dumps(obj) -> str:
+    """Pretty JSON for the Code boxes (orjson; anything it can't encode falls back to str)."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+
+
+@functools.lru_cache(maxsize=1)
+def _list_local_files_cached(mtime_ns: int) -> tuple[str, ...]:
+    # Keyed on the directory mtime (changes on add/remove/rename); scandir avoids a Path per entry
+    with os.scandir(DATA_DIR) as it:
+        names = [e.name for e in it if e.name.endswith(".json") and e.is_file()]
+    names.sort()
+    return tuple(names)
+
 
 def _list_local_files() -> list[str]:
     """List available JSON files in backend/data/."""
-    if not DATA_DIR.exists():
+    try:
+        mtime_ns = DATA_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
         return []
-    return sorted(f.name for f in DATA_DIR.glob("*.json"))
+    return list(_list_local_files_cached(mtime_ns))
+
 
+def _provider_markdown(label: str, text: str | None) -> str | None:
+    # The backend reports failures as "[ERROR] ..." strings; show them as a callout rather than a raw tag.
+    # A provider can also return None (e.g. a blocked or refused reply); that passes through unchanged.
+    if text and text.startswith("[ERROR]"):
+        return f"**{label} error:** `{text[len('[ERROR]'):].strip()}`"
+    return text
 
-def _run_predictions(data_str: str):
-    """Run all three providers and return their results."""
-    claude = asyncio.run(ask_claude(data_str))
-    gemini = asyncio.run(ask_gemini(data_str))
-    openai = asyncio.run(ask_openai(data_str))
-    return claude, gemini, openai
 
+def _predictions_markdown(results: tuple[str, str, str]) -> tuple[str, str, str]:
+    claude, gemini, openai = results
+    return (
+        _provider_markdown("Claude", claude),
+        _provider_markdown("Gemini", gemini),
+        _provider_markdown("OpenAI", openai),
+    )
 
-def _load_and_prepare(filepath) -> str:
-    """Load a file, apply JSON trimming or line cap for non-JSON."""
-    with open(filepath, "rb") as f:
-        raw = f.read()
-    return prepare_input(raw, str(filepath))
 
+async def _run_predictions(data_str: str):
+    """Run all three providers concurrently and return their results; a failed provider renders inline."""
+    return _predictions_markdown(await _arun(_main().ask_all_providers(data_str)))
 
-def analyse_uploaded(file):
+
+# Persisted prepared inputs for backend/data files, one subdirectory per main.PREPARED_INPUT_TAG (git-ignored)
+_PREPARED_DIR = Path(__file__).parent / ".prepared-cache"
+
+
+@functools.lru_cache(maxsize=1)
+def _prepared_dir(tag: str) -> Path:
+    # First use of a tag removes entries written under any other tag, so format changes don't leave files behind
+    if _PREPARED_DIR.is_dir():
+        for entry in _PREPARED_DIR.iterdir():
+            if entry.name != tag and entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+    return _PREPARED_DIR / tag
+
+
+def _read_prepared(prepared: Path, mtime_ns: int) -> str | None:
+    try:
+        if prepared.stat().st_mtime_ns >= mtime_ns:
+            return prepared.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    return None
+
+
+@functools.lru_cache(maxsize=16)
+def _load_and_prepare_cached(path: str, mtime_ns: int, size: int, persist: bool) -> str:
+    # Keyed on mtime and size so a rewritten file misses; the same file used from several tabs is read once.
+    # With persist, the result is also kept under _PREPARED_DIR (named by a digest of the path) and reused while
+    # it is no older than the source, so a restart doesn't re-parse unchanged local files.
+    backend = _main()
+    digest = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+    prepared = _prepared_dir(backend.PREPARED_INPUT_TAG) / f"{digest}.prepared"
+    if persist:
+        text = _read_prepared(prepared, mtime_ns)
+        if text is not None:
+            return text
+    text = backend.prepare_input_path(path)
+    if persist:
+        # Temp file (per process and thread) + rename, so concurrent writers never publish a partial sidecar
+        backend._disk_cache_write(prepared, text)
+    return text
+
+
+def _load_and_prepare(filepath, persist: bool = False) -> str:
+    """
+    Load a file, apply JSON trimming or line cap for non-JSON.
+    persist=True keeps an on-disk prepared copy; only for files with a stable identity (backend/data), not uploads.
+    """
+    st = os.stat(filepath)
+    return _load_and_prepare_cached(str(filepath), st.st_mtime_ns, st.st_size, persist)
+
+
+async def analyse_uploaded(file):
     """Analyse an uploaded JSON file."""
     if file is None:
         return "Upload a file first.", "", ""
-    data_str = _load_and_prepare(file.name)
-    return _run_predictions(data_str)
+    data_str = await asyncio.to_thread(_load_and_prepare, file.name)
+    return await _run_predictions(data_str)
 
 
-def parse_pdf(file):
+# Rendered parse results by blake2b digest of the PDF bytes, so re-extracting the same file skips the LLM
+_PDF_CACHE: OrderedDict[bytes, str] = OrderedDict()
+_PDF_CACHE_MAX = 16
+
+
+async def parse_pdf(file):
     """Parse a PDF bank statement and extract transactions as JSON."""
     if file is None:
-        return json.dumps({"error": "Upload a PDF file first.", "transactions": []})
+        return _dumps({"error": "Upload a PDF file first.", "transactions": []})
 
+    # Async handler: no Gradio worker thread is held while the PDF is extracted and sent to the LLM
     try:
-        with open(file.name, "rb") as f:
-            raw_bytes = f.read()
-
-        result = asyncio.run(parse_pdf_to_transactions(raw_bytes))
-        return json.dumps(result, indent=2)
+        raw_bytes = await asyncio.to_thread(Path(file.name).read_bytes)
+        key = hashlib.blake2b(raw_bytes, digest_size=16).digest()
+        if key in _PDF_CACHE:
+            _PDF_CACHE.move_to_end(key)
+            return _PDF_CACHE[key]
+        result = await _arun(_main().parse_pdf_to_transactions(raw_bytes))
+        out = _dumps(result)
+        # Failed extractions are retried next time rather than cached
+        if not result.get("error"):
+            _PDF_CACHE[key] = out
+            if len(_PDF_CACHE) > _PDF_CACHE_MAX:
+                _PDF_CACHE.popitem(last=False)
+        return out
     except Exception as e:
-        return json.dumps({"error": str(e), "transactions": []})
+        return _dumps({"error": str(e), "transactions": []})
+
+
+# Opt-in speculative analysis: picking a file in the Local Data dropdown starts its provider fan-out right away,
+# and the Analyse click awaits that run instead of starting its own. Off by default since browsing the
+# dropdown then spends API calls on files that may never be analysed.
+_PREFETCH = os.getenv("PROPHIT_PREFETCH") == "1"
+_PREFETCH_TTL = 600.0
+_PENDING: dict[str, tuple[float, concurrent.futures.Future]] = {}
+
+
+async def _predict_local(filepath: Path) -> tuple[str, str, str]:
+    # Runs on the backend loop; the first use imports the backend, so do that off the loop
+    backend = await asyncio.to_thread(_main)
+    data_str = await asyncio.to_thread(_load_and_prepare, filepath, True)
+    return await backend.ask_all_providers(data_str)
 
 
-def analyse_local(filename):
+def _prefetch_local(filename):
+    """Dropdown change handler: schedule the selected file's analysis in the background (if enabled)."""
+    if not _PREFETCH or not filename:
+        return
+    now = time.monotonic()
+    for name, (started, _) in list(_PENDING.items()):
+        if now - started >= _PREFETCH_TTL:
+            _PENDING.pop(name, None)
+    filepath = DATA_DIR / filename
+    if filename not in _PENDING and filepath.exists():
+        _PENDING[filename] = (now, asyncio.run_coroutine_threadsafe(_predict_local(filepath), _LOOP))
+
+
+async def analyse_local(filename):
     """Analyse a file from backend/data/."""
     if not filename:
         return "Select a file first.", "", ""
     filepath = DATA_DIR / filename
     if not filepath.exists():
         return f"File not found: {filepath}", "", ""
-    return _run_predictions(_load_and_prepare(filepath))
-
-
-def _format_calendar(raw_json: str) -> str:
-    """Format calendar JSON into a readable markdown string."""
-    try:
-        cleaned = raw_json.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        elif cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        cleaned = cleaned.strip()
-        cal = json.loads(cleaned)
-    except (json.JSONDecodeError, TypeError):
-        return raw_json
-
-    lines = [f"## Week Ahead — Starting {cal.get('week_start', '?')}\n"]
-    for day in cal.get("daily_predictions", []):
-        lines.append(f"### {day['day']} ({day['date']})")
-        for p in day.get("predictions", []):
-            agreed_list = p.get("agreed_by") or []
-            agreed = ", ".join(str(x) for x in agreed_list) if agreed_list else "—"
-            avg = p.get("avg_spend", 0)
-            lines.append(
-                f"- **{p['behavior']}** — {p.get('likelihood', 0)}% likelihood, "
-                f"~${avg:.2f} avg  _(agreed: {agreed})_"
-            )
-        lines.append("")
-    return "\n".join(lines)
-
-
-def _format_week_ahead_response(result: dict) -> str:
-    """Build markdown: location, context used (only true when at least one day has weather or holiday ok), summary, debug panel, calendar."""
-    parts = []
+    pending = _PENDING.pop(filename, None)
+    if pending is not None and time.monotonic() - pending[0] < _PREFETCH_TTL:
+        try:
+            return _predictions_markdown(await asyncio.wrap_future(pending[1]))
+        except Exception:
+            pass  # The speculative run failed; analyse normally below
+    return await _run_predictions(await asyncio.to_thread(_load_and_prepare, filepath, True))
+
+
+# %-template: one C-level format call per row, with no per-row dict of fields
+_PRED_ROW = "- **%s** — %s%% likelihood, ~$%.2f avg  _(agreed: %s)_"
+# Shared default for missing lists, so a lookup miss doesn't allocate
+_EMPTY = ()
+
+
+def _prediction_line(p: dict) -> str:
+    return _PRED_ROW % (
+        p["behavior"],
+        p.get("likelihood", 0),
+        p.get("avg_spend", 0),
+        ", ".join(map(str, p.get("agreed_by") or _EMPTY)) or "—",
+    )
+
+
+def _calendar_markdown(cal: dict) -> str:
+    """Markdown for a final calendar: title, then one block per day (heading, prediction lines, blank line)."""
+    # Written into one growing buffer instead of collecting a list of line strings and joining them
+    buf = io.StringIO()
+    w = buf.write
+    w(f"## Week Ahead — Starting {cal.get('week_start', '?')}\n")
+    for day in cal.get("daily_predictions", _EMPTY):
+        w(f"\n### {day['day']} ({day['date']})")
+        for p in day.get("predictions", _EMPTY):
+            w("\n")
+            w(_prediction_line(p))
+        w("\n")
+    return buf.getvalue()
+
+
+def _day_status_row(dc: dict) -> str:
+    w = dc.get("weather") or {}
+    h = dc.get("holiday") or {}
+    return (
+        f"| {dc.get('date', '?')} | {w.get('weather_status') or '—'} | "
+        f"{h.get('holiday_status') or '—'} | {(h.get('holiday_error') or '—')[:40]} |"
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def _format_week_ahead_response(result_json: str) -> str:
+    """
+    Build markdown: location, context used (only true when at least one day has weather or holiday ok), summary, debug panel, calendar.
+    Takes the pipeline result as the JSON already rendered for the raw box, so repeat results hit the cache.
+    """
+    result = orjson.loads(result_json)
     # Location
     if result.get("used_default_location"):
-        parts.append("**Location:** Default (London)")
+        location = "**Location:** Default (London)"
     else:
-        src = result.get("location_source", "unknown")
-        parts.append(f"**Location:** From {src} (request or env)")
-    parts.append("")
+        location = f"**Location:** From {result.get('location_source', 'unknown')} (request or env)"
     # Context used: true only if at least one day has weather_status=="ok" or holiday_status=="ok"
-    context_used = result.get("context_available") or result.get("context_used")
-    if context_used:
-        parts.append("**Context used:** Yes — weather and/or holiday data used for predictions.")
+    if result.get("context_available") or result.get("context_used"):
+        context = "**Context used:** Yes — weather and/or holiday data used for predictions."
     else:
-        parts.append("**Context used:** No — context unavailable; predictions are history-only.")
+        context = "**Context used:** No — context unavailable; predictions are history-only."
         errs = result.get("context_errors") or []
         if errs:
-            parts.append("_( " + "; ".join(errs) + " )_")
-    parts.append("")
-    parts.append("### Context Summary\n")
-    parts.append(result.get("context_summary") or "—")
+            context += "\n_( " + "; ".join(errs) + " )_"
+    parts = [
+        f"{location}\n\n{context}\n\n### Context Summary\n",
+        result.get("context_summary") or "—",
+    ]
     # Debug panel: per-day weather_status, holiday_status, holiday_error
     day_context = result.get("day_context") or []
     if day_context:
         parts.append("\n#### Debug: Per-day context status\n")
-        parts.append("| Date | weather_status | holiday_status | holiday_error |")
-        parts.append("|------|----------------|----------------|---------------|")
-        for dc in day_context:
-            w = dc.get("weather") or {}
-            h = dc.get("holiday") or {}
-            ws = w.get("weather_status") or "—"
-            hs = h.get("holiday_status") or "—"
-            he = (h.get("holiday_error") or "—")[:40]
-            parts.append(f"| {dc.get('date', '?')} | {ws} | {hs} | {he} |")
+        parts.append("\n".join([
+            "| Date | weather_status | holiday_status | holiday_error |",
+            "|------|----------------|----------------|---------------|",
+            *map(_day_status_row, day_context),
+        ]))
     parts.append("\n---\n\n")
-    cal = result.get("final_calendar") or {}
-    parts.append(f"## Week Ahead — Starting {cal.get('week_start', '?')}\n")
-    for day in cal.get("daily_predictions", []):
-        parts.append(f"### {day['day']} ({day['date']})")
-        for p in day.get("predictions", []):
-            agreed_list = p.get("agreed_by") or []
-            agreed = ", ".join(str(x) for x in agreed_list) if agreed_list else "—"
-            avg = p.get("avg_spend", 0)
-            parts.append(
-                f"- **{p['behavior']}** — {p.get('likelihood', 0)}% likelihood, "
-                f"~${avg:.2f} avg  _(agreed: {agreed})_"
-            )
-        parts.append("")
+    parts.append(_calendar_markdown(result.get("final_calendar") or {}))
     return "\n".join(parts)
 
 
-def calendar_uploaded(file):
+# Rendered week-ahead results by blake2b digest of the prepared input: re-viewing the same file within the TTL
+# skips the weather/holiday fetches and all seven LLM calls
+_WEEK_CACHE: OrderedDict[bytes, tuple[float, str, str]] = OrderedDict()
+_WEEK_CACHE_MAX = 8
+_WEEK_CACHE_TTL = 600.0
+
+
+async def _week_ahead(data_str: str) -> tuple[str, str]:
+    key = hashlib.blake2b(data_str.encode("utf-8", errors="replace"), digest_size=16).digest()
+    now = time.monotonic()
+    hit = _WEEK_CACHE.get(key)
+    if hit is not None and now - hit[0] < _WEEK_CACHE_TTL:
+        _WEEK_CACHE.move_to_end(key)
+        return hit[1], hit[2]
+    result = await _arun(_main().run_week_ahead_pipeline(data_str, include_candidate_outputs=False))
+    raw = _dumps(result)
+    md = _format_week_ahead_response(raw)
+    # Failed runs are retried next time rather than cached
+    if not result.get("error"):
+        _WEEK_CACHE[key] = (now, md, raw)
+        _WEEK_CACHE.move_to_end(key)
+        if len(_WEEK_CACHE) > _WEEK_CACHE_MAX:
+            _WEEK_CACHE.popitem(last=False)
+    return md, raw
+
+
+async def calendar_uploaded(file):
     """Run context-aware week-ahead pipeline (weather + holidays + 3 candidates + judge)."""
     if file is None:
         return "Upload a file first.", "{}"
-    data_str = _load_and_prepare(file.name)
-    result = asyncio.run(run_week_ahead_pipeline(data_str, include_candidate_outputs=False))
-    md = _format_week_ahead_response(result)
-    raw = json.dumps(result, indent=2)
-    return md, raw
+    return await _week_ahead(await asyncio.to_thread(_load_and_prepare, file.name))
 
 
-def calendar_local(filename):
+async def calendar_local(filename):
     """Run context-aware week-ahead pipeline for a local file."""
     if not filename:
         return "Select a file first.", "{}"
     filepath = DATA_DIR / filename
     if not filepath.exists():
         return f"File not found: {filepath}", "{}"
-    data_str = _load_and_prepare(filepath)
-    result = asyncio.run(run_week_ahead_pipeline(data_str, include_candidate_outputs=False))
-    md = _format_week_ahead_response(result)
-    raw = json.dumps(result, indent=2)
-    return md, raw
+    return await _week_ahead(await asyncio.to_thread(_load_and_prepare, filepath, True))
 
 
-def get_tips(predictions_text):
+async def get_tips(predictions_text):
     """Get budget tips from predicted spending."""
     if not predictions_text or not predictions_text.strip():
         return "Enter spending predictions first."
-    tips = asyncio.run(get_budget_tips(predictions_text))
-    return tips
+    # First use imports the backend; keep that off Gradio's event loop
+    backend = await asyncio.to_thread(_main)
+    return await _arun(backend.get_budget_tips(predictions_text))
 
 
-def get_runway(financial_text):
+async def get_runway(financial_text):
     """Get how long user can go without income from financial summary."""
     if not financial_text or not financial_text.strip():
         return "Enter a financial summary (savings, monthly expenses) first."
-    return asyncio.run(get_income_runway(financial_text))
+    backend = await asyncio.to_thread(_main)
+    return await _arun(backend.get_income_runway(financial_text))
 
 
-def runway_summary_from_upload(file):
+async def runway_summary_from_upload(file):
     """Generate financial summary from an uploaded file and return it for the runway textbox."""
     if file is None:
         return ""
     path = file.name if hasattr(file, "name") else file
-    data_str = _load_and_prepare(path)
-    return asyncio.run(generate_financial_summary(data_str))
+    data_str = await asyncio.to_thread(_load_and_prepare, path)
+    return await _arun(_main().generate_financial_summary(data_str))
 
 
-def runway_summary_from_local(filename):
+async def runway_summary_from_local(filename):
     """Generate financial summary from a local backend/data file for the runway textbox."""
     if not filename:
         return ""
     filepath = DATA_DIR / filename
     if not filepath.exists():
         return ""
-    data_str = _load_and_prepare(filepath)
-    return asyncio.run(generate_financial_summary(data_str))
+    data_str = await asyncio.to_thread(_load_and_prepare, filepath, True)
+    return await _arun(_main().generate_financial_summary(data_str))
+
+
+def _warm_local_files() -> None:
+    # Fill the prepared-input cache (and .prepared sidecars) for as many backend/data files as it holds,
+    # so the first Local Data click goes straight to the providers
+    for name in _list_local_files()[:_load_and_prepare_cached.cache_info().maxsize]:
+        try:
+            _load_and_prepare(DATA_DIR / name, True)
+        except Exception:
+            pass  # A bad file reports its error when it is actually analysed
+
+
+if _PREWARM:
+    threading.Thread(target=_warm_local_files, name="ui-warm-local", daemon=True).start()
 
 
 with gr.Blocks(
@@ -269,6 +463,8 @@ with gr.Blocks(
                 inputs=[file_dropdown],
                 outputs=[claude_loc, gemini_loc, openai_loc],
             )
+            if _PREFETCH:
+                file_dropdown.change(fn=_prefetch_local, inputs=[file_dropdown], outputs=None)
 
         # --- Tab 3: Week Ahead Calendar ---
         with gr.Tab("Week Ahead"):
@@ -344,11 +540,11 @@ with gr.Blocks(
             runway_btn = gr.Button("How long without income?", variant="primary")
             runway_output = gr.Markdown(label="Runway")
 
-            def _runway_summary_from_file(upload, local_name):
+            async def _runway_summary_from_file(upload, local_name):
                 if upload is not None:
-                    return runway_summary_from_upload(upload)
+                    return await runway_summary_from_upload(upload)
                 if local_name:
-                    return runway_summary_from_local(local_name)
+                    return await runway_summary_from_local(local_name)
                 return ""
 
             runway_gen_btn.click(
@@ -378,4 +574,5 @@ with gr.Blocks(
             )
 
 if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=8003)
+    # Let up to 4 events per handler run at once, so a slow PDF/LLM call doesn't queue every other click
+    demo.queue(default_concurrency_limit=4).launch(server_name="0.0.0.0", server_port=8003)